@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Compare the reflective update walk with the precompiled entity extraction plans used by CacheHandler."""
+import argparse
+import os
+import sys
+import timeit
+
+from telegram import Update
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.telegram.EntityExtractor import EntityExtractor  # noqa: E402
+
+_USER = {"id": 1001, "is_bot": False, "first_name": "Alice", "username": "alice"}
+_OTHER_USER = {"id": 1002, "is_bot": False, "first_name": "Bob", "last_name": "Smith"}
+_GROUP = {"id": -1002353726867, "type": "supergroup", "title": "Test group"}
+_CHANNEL = {"id": -1001111111111, "type": "channel", "title": "Spam channel", "username": "spam"}
+_PHOTO = [
+    {"file_id": f"photo-{size}", "file_unique_id": f"unique-{size}", "width": size, "height": size, "file_size": size}
+    for size in (90, 320, 800, 1280)
+]
+
+PAYLOADS = {
+    "text message": {
+        "update_id": 1,
+        "message": {"message_id": 10, "date": 1700000000, "chat": _GROUP, "from": _USER, "text": "hello"},
+    },
+    "photo reply with entities": {
+        "update_id": 2,
+        "message": {
+            "message_id": 11,
+            "date": 1700000000,
+            "chat": _GROUP,
+            "from": _USER,
+            "photo": _PHOTO,
+            "caption": "look @bob",
+            "caption_entities": [
+                {"type": "text_mention", "offset": 5, "length": 4, "user": _OTHER_USER},
+                {"type": "bold", "offset": 0, "length": 4},
+            ],
+            "reply_to_message": {
+                "message_id": 9,
+                "date": 1699999990,
+                "chat": _GROUP,
+                "from": _OTHER_USER,
+                "text": "previous message",
+            },
+        },
+    },
+    "channel forward": {
+        "update_id": 3,
+        "message": {
+            "message_id": 12,
+            "date": 1700000000,
+            "chat": _GROUP,
+            "from": _USER,
+            "text": "forwarded spam",
+            "forward_origin": {"type": "channel", "date": 1699990000, "chat": _CHANNEL, "message_id": 77},
+        },
+    },
+    "chat member": {
+        "update_id": 4,
+        "chat_member": {
+            "chat": _GROUP,
+            "from": _OTHER_USER,
+            "date": 1700000000,
+            "old_chat_member": {"status": "member", "user": _USER},
+            "new_chat_member": {"status": "kicked", "user": _USER, "until_date": 0},
+        },
+    },
+    "callback query": {
+        "update_id": 5,
+        "callback_query": {
+            "id": "cb",
+            "from": _USER,
+            "chat_instance": "instance",
+            "data": "REPORT_BAN:1:2",
+            "message": {"message_id": 13, "date": 1700000000, "chat": _GROUP, "from": _OTHER_USER, "text": "report"},
+        },
+    },
+}
+
+
+def _walk(extractor: EntityExtractor, update: Update) -> None:
+    extractor._walk(update, {}, {}, set())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=20_000, help="Iterations per payload")
+    args = parser.parse_args()
+
+    extractor = EntityExtractor()
+    print(f"{'payload':<28} {'walk, us':>10} {'plan, us':>10} {'speedup':>8}")
+    for name, payload in PAYLOADS.items():
+        update = Update.de_json(payload, None)
+        walk_seconds = timeit.timeit(lambda: _walk(extractor, update), number=args.number)
+        plan_seconds = timeit.timeit(lambda: extractor.extract(update), number=args.number)
+        print(f"{name:<28} {walk_seconds / args.number * 1e6:>10.2f} {plan_seconds / args.number * 1e6:>10.2f} "
+              f"{walk_seconds / plan_seconds:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Compare hourly Lols ban list snapshots kept as separate sets with the merged BanListIndex."""
+import argparse
+import os
+import random
+import sys
+import time
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.handlers.spam_filters.lols.BanListIndex import BanListIndex  # noqa: E402
+
+_ID_RANGE = (1_000_000_000, 8_000_000_000)
+_HOUR_SEC = 60 * 60
+
+
+def _generate_snapshots(snapshots: int, list_size: int, churn: float) -> list[list[int]]:
+    """Hourly lists where a `churn` share of ids is replaced every hour."""
+    current_ids = set(random.randint(*_ID_RANGE) for _ in range(list_size))
+    result = []
+    for _ in range(snapshots):
+        result.append(list(current_ids))
+        replaced_ids = random.sample(sorted(current_ids), int(list_size * churn))
+        current_ids.difference_update(replaced_ids)
+        current_ids.update(random.randint(*_ID_RANGE) for _ in range(len(replaced_ids)))
+    return result
+
+
+def _build_sets(snapshots: list[list[int]]) -> dict[float, set[int]]:
+    return {float(hour): set(user_ids) for hour, user_ids in enumerate(snapshots)}
+
+
+def _build_index(snapshots: list[list[int]], now: float) -> BanListIndex:
+    index = BanListIndex()
+    for hour, user_ids in enumerate(snapshots):
+        index = index.merged(user_ids, expires_at=int(now + (hour + 1) * _HOUR_SEC), now=now)
+    return index
+
+
+def _measure_memory(builder) -> tuple[object, int]:
+    tracemalloc.start()
+    structure = builder()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return structure, current
+
+
+def _is_in_sets(sets: dict[float, set[int]], user_id: int) -> bool:
+    for banned_ids in sets.values():
+        if user_id in banned_ids:
+            return True
+    return False
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--snapshots", type=int, default=72, help="Number of hourly snapshots")
+    parser.add_argument("--list-size", type=int, default=20_000, help="Ids per snapshot")
+    parser.add_argument("--churn", type=float, default=0.05, help="Share of ids replaced every hour")
+    parser.add_argument("--lookups", type=int, default=200_000, help="Number of lookups")
+    args = parser.parse_args()
+
+    random.seed(42)
+    snapshots = _generate_snapshots(args.snapshots, args.list_size, args.churn)
+    now = time.time()
+    sets, sets_bytes = _measure_memory(lambda: _build_sets(snapshots))
+    index = _build_index(snapshots, now)
+    index_bytes = (len(index.user_ids) * index.user_ids.itemsize
+                   + len(index.expires_at) * index.expires_at.itemsize)
+    merge_seconds = timeit.timeit(lambda: index.merged(snapshots[-1], expires_at=int(now + _HOUR_SEC), now=now),
+                                  number=5) / 5
+
+    banned_ids = list(index.user_ids)
+    # Most checked users are not banned, which is the worst case for scanning every snapshot
+    lookup_ids = [random.choice(banned_ids) if random.random() < 0.1 else random.randint(*_ID_RANGE)
+                  for _ in range(args.lookups)]
+    sets_seconds = timeit.timeit(lambda: [_is_in_sets(sets, user_id) for user_id in lookup_ids], number=1)
+    index_seconds = timeit.timeit(lambda: [index.contains(user_id, now) for user_id in lookup_ids], number=1)
+
+    print(f"snapshots={args.snapshots} list_size={args.list_size} unique_ids={len(index)}")
+    print(f"{'representation':<16} {'memory, MiB':>12} {'lookup, us':>11}")
+    print(f"{'sets':<16} {sets_bytes / 2 ** 20:>12.2f} {sets_seconds / args.lookups * 1e6:>11.3f}")
+    print(f"{'merged index':<16} {index_bytes / 2 ** 20:>12.2f} {index_seconds / args.lookups * 1e6:>11.3f}")
+    print(f"merged index refresh: {merge_seconds * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
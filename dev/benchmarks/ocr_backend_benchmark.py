@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Compare per-image OCR latency of the pytesseract and tesserocr engines used by the OCR worker pool.
+
+Images are taken from the given directory; without one, synthetic text screenshots are generated.
+The tesserocr engine is measured only when the optional tesserocr package is installed.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.handlers.spam_filters.ocr.ImagePreprocessor import ImagePreprocessor  # noqa: E402
+from src.handlers.spam_filters.ocr.OCREngine import OCREngine, OCREngineType  # noqa: E402
+
+_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+_SYNTHETIC_TEXT = "Earn 500$ a day from home, write to @manager now"
+
+
+def _load_images(images_path: str | None, synthetic_images: int) -> list[Image.Image]:
+    if images_path is None:
+        images = []
+        for index in range(synthetic_images):
+            image = Image.new("RGB", (800, 600), "white")
+            draw = ImageDraw.Draw(image)
+            for line in range(10):
+                draw.text((20, 20 + line * 50), f"{index}: {_SYNTHETIC_TEXT}", fill="black", font_size=24)
+            images.append(image)
+        return images
+    images = []
+    for file_name in sorted(os.listdir(images_path)):
+        if file_name.lower().endswith(_IMAGE_EXTENSIONS):
+            with Image.open(os.path.join(images_path, file_name)) as image:
+                images.append(image.copy())
+    return images
+
+
+def _measure(engine: OCREngine, images: list[Image.Image], rounds: int) -> list[float]:
+    latencies = []
+    for _ in range(rounds):
+        for image in images:
+            started_at = time.perf_counter()
+            engine.recognize(image)
+            latencies.append(time.perf_counter() - started_at)
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("images", nargs="?", help="Directory with images, synthetic images are used if omitted")
+    parser.add_argument("--synthetic-images", type=int, default=10, help="Number of generated images")
+    parser.add_argument("--rounds", type=int, default=3, help="Passes over all images per engine")
+    parser.add_argument("--lang", default=os.getenv("TESSERACT_LANG", "rus"), help="Tesseract language")
+    parser.add_argument("--tesseract-cmd", default=os.getenv("TESSERACT_PATH"), help="Path to tesseract")
+    args = parser.parse_args()
+
+    preprocessor = ImagePreprocessor(max_image_side=2000, binarize=False, min_edge_density=0)
+    images = [preprocessor.preprocess(image) for image in _load_images(args.images, args.synthetic_images)]
+    engine_types = [OCREngineType.PYTESSERACT]
+    if OCREngineType.TESSEROCR.resolve() == OCREngineType.TESSEROCR:
+        engine_types.append(OCREngineType.TESSEROCR)
+    else:
+        print("tesserocr is not installed, measuring pytesseract only")
+
+    print(f"images={len(images)} rounds={args.rounds} lang={args.lang}")
+    print(f"{'engine':<12} {'startup, ms':>12} {'median, ms':>11} {'p90, ms':>9}")
+    for engine_type in engine_types:
+        started_at = time.perf_counter()
+        engine = OCREngine.create(engine_type, args.tesseract_cmd, args.lang, timeout_sec=60)
+        startup_seconds = time.perf_counter() - started_at
+        latencies = sorted(_measure(engine, images, args.rounds))
+        p90 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.9))]
+        print(f"{engine_type:<12} {startup_seconds * 1e3:>12.0f} {statistics.median(latencies) * 1e3:>11.0f} "
+              f"{p90 * 1e3:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
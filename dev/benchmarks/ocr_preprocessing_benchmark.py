@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Measure OCR latency and recognized text quality with and without image preprocessing.
+
+Every image in the directory is recognized with each pipeline variant. If a `<image name>.txt` file with the expected
+text is placed next to an image, quality is the similarity to that text; otherwise it is the similarity to the text
+recognized from the original full-size image.
+"""
+import argparse
+import difflib
+import os
+import statistics
+import sys
+import time
+
+import pytesseract
+from PIL import Image
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.handlers.spam_filters.ocr.ImagePreprocessor import ImagePreprocessor  # noqa: E402
+
+_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _similarity(text: str, expected_text: str) -> float:
+    return difflib.SequenceMatcher(None, _normalize(text), _normalize(expected_text)).ratio()
+
+
+def _as_photo_size(image: Image.Image, side: int) -> Image.Image:
+    """Emulates a smaller Telegram PhotoSize of the same photo."""
+    image = image.copy()
+    image.thumbnail((side, side), Image.Resampling.LANCZOS)
+    return image
+
+
+def _get_variants(args: argparse.Namespace) -> dict:
+    greyscale = ImagePreprocessor(args.max_image_side, binarize=False, min_edge_density=0)
+    binarized = ImagePreprocessor(args.max_image_side, binarize=True, min_edge_density=0)
+    return {
+        "original": lambda image: image,
+        "greyscale": greyscale.preprocess,
+        "binarized": binarized.preprocess,
+        f"{args.photo_side}px greyscale": lambda image: greyscale.preprocess(_as_photo_size(image, args.photo_side)),
+        f"{args.photo_side}px binarized": lambda image: binarized.preprocess(_as_photo_size(image, args.photo_side)),
+    }
+
+
+def _recognize(image: Image.Image | None, lang: str) -> tuple[str, float]:
+    started_at = time.perf_counter()
+    text = "" if image is None else pytesseract.image_to_string(image, lang=lang)
+    return text, time.perf_counter() - started_at
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("images", help="Directory with spam screenshots")
+    parser.add_argument("--lang", default=os.getenv("TESSERACT_LANG", "rus"), help="Tesseract language")
+    parser.add_argument("--tesseract-cmd", default=os.getenv("TESSERACT_PATH"), help="Path to tesseract")
+    parser.add_argument("--photo-side", type=int, default=800, help="Longer side of the emulated smaller photo size")
+    parser.add_argument("--max-image-side", type=int, default=2000, help="Downsampling limit of the preprocessor")
+    parser.add_argument("--min-edge-density", type=float, default=0.02, help="Edge density threshold to report")
+    args = parser.parse_args()
+    if args.tesseract_cmd:
+        pytesseract.pytesseract.tesseract_cmd = args.tesseract_cmd
+
+    image_paths = sorted(
+        os.path.join(args.images, file_name)
+        for file_name in os.listdir(args.images)
+        if file_name.lower().endswith(_IMAGE_EXTENSIONS)
+    )
+    if not image_paths:
+        parser.error(f"No images found in {args.images}")
+
+    variants = _get_variants(args)
+    latencies: dict[str, list[float]] = {name: [] for name in variants}
+    qualities: dict[str, list[float]] = {name: [] for name in variants}
+    edge_densities = []
+    density_probe = ImagePreprocessor(0, binarize=False, min_edge_density=0)
+    for image_path in image_paths:
+        with Image.open(image_path) as source_image:
+            image = source_image.copy()
+        edge_densities.append(density_probe.get_edge_density(image.convert("L")))
+        expected_path = f"{image_path}.txt"
+        expected_text = None
+        if os.path.exists(expected_path):
+            with open(expected_path) as f:
+                expected_text = f.read()
+        for name, variant in variants.items():
+            text, latency = _recognize(variant(image), args.lang)
+            if expected_text is None:
+                expected_text = text
+            latencies[name].append(latency)
+            qualities[name].append(_similarity(text, expected_text))
+
+    print(f"images={len(image_paths)} lang={args.lang}")
+    print(f"{'variant':<22} {'median, ms':>11} {'p90, ms':>9} {'quality':>8}")
+    for name in variants:
+        sorted_latencies = sorted(latencies[name])
+        p90 = sorted_latencies[min(len(sorted_latencies) - 1, int(len(sorted_latencies) * 0.9))]
+        print(f"{name:<22} {statistics.median(sorted_latencies) * 1e3:>11.0f} {p90 * 1e3:>9.0f} "
+              f"{statistics.mean(qualities[name]):>8.1%}")
+    skipped = sum(1 for density in edge_densities if density < args.min_edge_density)
+    print(f"edge density: min={min(edge_densities):.3f} median={statistics.median(edge_densities):.3f}; "
+          f"{skipped} image(s) would be skipped with OCR_MIN_EDGE_DENSITY={args.min_edge_density}")
+
+
+if __name__ == "__main__":
+    main()
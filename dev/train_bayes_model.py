@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Train the local naive Bayes model used by BayesSpamFilter from the OpenAI verdict log.
+A held-out share of the log is classified first to show how many messages the given thresholds would decide locally
+and how often these local verdicts disagree with OpenAI; the saved model is then trained on the whole log.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.handlers.spam_filters.bayes.HashedNaiveBayesModel import HashedNaiveBayesModel  # noqa: E402
+from src.handlers.spam_filters.bayes.VerdictLog import VerdictLog  # noqa: E402
+from src.handlers.spam_filters.openai.TextFingerprint import get_fingerprint, normalize_text  # noqa: E402
+from src.util.EnvUtil import get_float_env  # noqa: E402
+
+_DATA_FOLDER_PATH = os.getenv("DATA_FOLDER_PATH") or "data"
+
+
+def _read_examples(log_path: str) -> list[tuple[str, bool]]:
+    """Reads the log, repeated texts are used once with their latest verdict."""
+    examples: dict[bytes, tuple[str, bool]] = {}
+    for text, verdict in VerdictLog.read(log_path):
+        examples[get_fingerprint(normalize_text(text))] = (text, verdict == "spam")
+    return list(examples.values())
+
+
+def _train(examples: list[tuple[str, bool]], feature_bits: int) -> HashedNaiveBayesModel:
+    model = HashedNaiveBayesModel(feature_bits)
+    for text, is_spam in examples:
+        model.learn(text, is_spam)
+    return model
+
+
+def _evaluate(model: HashedNaiveBayesModel, examples: list[tuple[str, bool]], spam_threshold: float,
+              not_spam_threshold: float) -> None:
+    spam_verdicts = wrong_spam_verdicts = not_spam_verdicts = wrong_not_spam_verdicts = 0
+    started_at = time.perf_counter()
+    for text, is_spam in examples:
+        spam_probability = model.get_spam_probability(text)
+        if spam_probability > spam_threshold:
+            spam_verdicts += 1
+            wrong_spam_verdicts += not is_spam
+        elif spam_probability < not_spam_threshold:
+            not_spam_verdicts += 1
+            wrong_not_spam_verdicts += is_spam
+    elapsed = time.perf_counter() - started_at
+    total = len(examples)
+    uncertain = total - spam_verdicts - not_spam_verdicts
+    print(f"held-out messages: {total}, classification: {elapsed / total * 1e6:.0f} us per message")
+    print(f"{'local verdict':<14} {'messages':>9} {'share':>7} {'OpenAI disagrees':>17}")
+    print(f"{'spam':<14} {spam_verdicts:>9} {spam_verdicts / total:>7.1%} {wrong_spam_verdicts:>17}")
+    print(f"{'not spam':<14} {not_spam_verdicts:>9} {not_spam_verdicts / total:>7.1%} {wrong_not_spam_verdicts:>17}")
+    print(f"{'uncertain':<14} {uncertain:>9} {uncertain / total:>7.1%} {'-':>17}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--log", default=os.path.join(_DATA_FOLDER_PATH, "verdict_log.jsonl"),
+                        help="OpenAI verdict log written with BAYES_VERDICT_LOG=true")
+    parser.add_argument("--output", default=os.path.join(_DATA_FOLDER_PATH, "bayes_model.bin"))
+    parser.add_argument("--feature-bits", type=int, default=18, help="Number of feature buckets as a power of two")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Share of messages used only for evaluation")
+    parser.add_argument("--spam-threshold", type=float, default=get_float_env("BAYES_SPAM_THRESHOLD", 0.999))
+    parser.add_argument("--not-spam-threshold", type=float, default=get_float_env("BAYES_NOT_SPAM_THRESHOLD", 0.01))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    examples = _read_examples(args.log)
+    spam_messages = sum(is_spam for _, is_spam in examples)
+    print(f"unique messages: {len(examples)}, spam: {spam_messages}, not spam: {len(examples) - spam_messages}")
+    if spam_messages == 0 or spam_messages == len(examples):
+        sys.exit("The log must contain both spam and not spam messages")
+
+    random.Random(args.seed).shuffle(examples)
+    holdout_size = int(len(examples) * args.holdout)
+    if holdout_size > 0:
+        model = _train(examples[holdout_size:], args.feature_bits)
+        _evaluate(model, examples[:holdout_size], args.spam_threshold, args.not_spam_threshold)
+
+    _train(examples, args.feature_bits).save(args.output)
+    print(f"model trained on all {len(examples)} messages saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -50,12 +50,14 @@ def main():
         finally:
             __stop_webserver(webserver, webserver_thread)
             telegram_api_status_service.stop()
+            bot_builder.shutdown()
         return
     logger.info("Starting webhook")
     try:
         asyncio.run(start_webhook(telegram_application, telegram_api_status_service))
     finally:
         telegram_api_status_service.stop()
+        bot_builder.shutdown()
 
 
 async def start_webhook(telegram_application: Application, telegram_api_status_service: TelegramApiStatusService):
@@ -65,6 +67,9 @@ async def start_webhook(telegram_application: Application, telegram_api_status_s
         await telegram_application.start()
         await webserver.serve()
         await telegram_application.stop()
+        # Application.stop() runs post_stop only in run_polling() and run_webhook()
+        if telegram_application.post_stop is not None:
+            await telegram_application.post_stop(telegram_application)
 
 
 def __get_application(polling: bool) -> Application:
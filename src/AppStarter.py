@@ -1,4 +1,5 @@
 import os
+from collections.abc import Awaitable, Callable
 from http import HTTPStatus
 
 import uvicorn
@@ -19,20 +20,33 @@ from src.handlers.spam_filters.openai.OpenAIWatchdog import OpenAIWatchdog
 from src.locale.LocaleFactory import LocaleFactory
 from src.telegram.EnrichedUpdate import EnrichedUpdate
 from src.telegram.TelegramApiStatusService import TelegramApiStatus, TelegramApiStatusService
+from src.util.EnvUtil import get_int_env
 from src.util.LoggerUtil import LoggerUtil
 from src.util.admin.AdminProvider import AdminProvider
 from src.util.admin.ChannelAdminProvider import ChannelAdminProvider
 from src.util.admin.SwyncaAdminProvider import SwyncaAdminProvider
 from src.util.data.BotState import BotState
+from src.util.data.EntityCache import EntityCache
+from src.util.data.JournalModelRepo import JournalModelRepo
 from src.util.data.JsonModelRepo import JsonModelRepo
+from src.util.data.ModelRepo import ModelRepo
+from src.util.data.SqliteBotState import SqliteBotState
+from src.util.data.SqliteModelRepo import SqliteModelRepo
+from src.util.data.WriteBehindModelRepo import WriteBehindModelRepo
 from telegram import Update
 
 
+__DEFAULT_CONCURRENT_UPDATES = 1
+
+
 def __get_telegram_application_builder(token: str, base_url: str) -> ApplicationBuilder:
+    # Updates are processed one by one unless concurrent processing is enabled explicitly
+    concurrent_updates = get_int_env("TELEGRAM_CONCURRENT_UPDATES", __DEFAULT_CONCURRENT_UPDATES, min_value=1)
     return (Application.builder()
             .token(token)
             .base_url(f"{base_url}/bot")
-            .base_file_url(f"{base_url}/file/bot"))
+            .base_file_url(f"{base_url}/file/bot")
+            .concurrent_updates(concurrent_updates))
 
 
 def get_telegram_application_webhook(token: str, base_url: str) -> Application:
@@ -76,6 +90,13 @@ class BotBuilder:
     workdir = os.path.dirname(os.path.abspath(__file__))
     __admin_provider_supplier = None
     telegram_application: Application = None
+    __DEFAULT_ENTITY_CACHE_MAX_ENTRIES = 50_000
+    __DEFAULT_ENTITY_CACHE_TTL_SECONDS = 60 * 60 * 24 * 30
+
+    def __init__(self):
+        self.__shutdown_callbacks: list[Callable[[], None]] = []
+        self.__stop_callbacks: list[Callable[[], Awaitable[None]]] = []
+        self.__entity_cache: EntityCache | None = None
 
     def __with_enriched_update(self, runnable):
         async def wrapper(update, context):
@@ -114,6 +135,7 @@ class BotBuilder:
             state,
             openai_config,
             openai_watchdog,
+            self.__get_data_folder_path(),
         )
 
         configuration_commands_handler: ConfigurationCommandsHandler = ConfigurationCommandsHandler(state)
@@ -147,17 +169,87 @@ class BotBuilder:
         self.telegram_application.add_handler(
             MessageHandler(filters.ALL, self.__with_enriched_update(antispam_filters.apply)))
         openai_watchdog.start(self.telegram_application)
+        antispam_filters.start(self.telegram_application)
+        self.__shutdown_callbacks.append(antispam_filters.stop)
+        self.__stop_callbacks.append(antispam_filters.close)
+        self.telegram_application.post_stop = self.__on_application_stop
+        self.__entity_cache.start(self.telegram_application)
+
+    def shutdown(self):
+        """Flush pending state and release resources created by build()."""
+        for shutdown_callback in reversed(self.__shutdown_callbacks):
+            # A failing resource must not prevent the remaining ones, such as the state, from being flushed
+            try:
+                shutdown_callback()
+            except Exception as error:
+                LoggerUtil.get_logger("AppStarter", "main").error(
+                    f"Shutdown of {shutdown_callback.__qualname__} failed: {type(error).__name__}: {error}")
+        self.__shutdown_callbacks.clear()
+
+    async def __on_application_stop(self, application: Application):
+        """Releases asynchronous resources while the event loop is still running."""
+        for stop_callback in reversed(self.__stop_callbacks):
+            try:
+                await stop_callback()
+            except Exception as error:
+                LoggerUtil.get_logger("AppStarter", "main").error(
+                    f"Stop of {stop_callback.__qualname__} failed: {type(error).__name__}: {error}")
+        self.__stop_callbacks.clear()
 
     def __add_command_handler(self, command: str, handler):
         self.telegram_application.add_handler(CommandHandler(command, self.__with_enriched_update(handler)))
 
     def __get_state(self) -> BotState:
         admin_provider: AdminProvider = self.__admin_provider_supplier()
+        entity_cache: EntityCache = self.__get_entity_cache()
         state_path = os.path.join(self.__get_data_folder_path(), "state.json")
-        state_repo: JsonModelRepo[BotState] = JsonModelRepo(state_path)
-        state: BotState = BotState.load_from_file(admin_provider, state_repo)
+        state_backend = os.getenv("STATE_BACKEND", "json")
+        if state_backend == "sqlite":
+            sqlite_state_repo = self.__get_sqlite_state_repo(state_path, entity_cache)
+            return SqliteBotState.load_from_file(admin_provider, sqlite_state_repo, entity_cache)
+        state_repo: ModelRepo[BotState] = self.__get_state_repo(state_path, state_backend)
+        state: BotState = BotState.load_from_file(admin_provider, state_repo, entity_cache)
         return state
 
+    def __get_entity_cache(self) -> EntityCache:
+        cache_path = os.path.join(self.__get_data_folder_path(), "entity_cache.json")
+        ttl_seconds = get_int_env("ENTITY_CACHE_TTL_SECONDS", self.__DEFAULT_ENTITY_CACHE_TTL_SECONDS)
+        entity_cache = EntityCache(
+            JsonModelRepo(cache_path),
+            max_entries=get_int_env("ENTITY_CACHE_MAX_ENTRIES", self.__DEFAULT_ENTITY_CACHE_MAX_ENTRIES, min_value=1),
+            ttl_seconds=ttl_seconds if ttl_seconds > 0 else None,
+        )
+        self.__entity_cache = entity_cache
+        self.__shutdown_callbacks.append(entity_cache.flush)
+        return entity_cache
+
+    def __get_state_repo(self, state_path: str, state_backend: str) -> ModelRepo[BotState]:
+        if state_backend == "journal":
+            return JournalModelRepo(state_path)
+        if state_backend != "json":
+            raise ValueError(f"Unsupported STATE_BACKEND: {state_backend}")
+        flush_interval_ms = get_int_env("STATE_FLUSH_INTERVAL_MS", 500)
+        if flush_interval_ms == 0:
+            return JsonModelRepo(state_path)
+        state_repo: WriteBehindModelRepo[BotState] = WriteBehindModelRepo(JsonModelRepo(state_path), flush_interval_ms)
+        self.__shutdown_callbacks.append(state_repo.close)
+        return state_repo
+
+    def __get_sqlite_state_repo(self, json_state_path: str,
+                                entity_cache: EntityCache) -> SqliteModelRepo[SqliteBotState]:
+        sqlite_state_path = os.path.join(self.__get_data_folder_path(), "state.sqlite3")
+        state_repo: SqliteModelRepo[SqliteBotState] = SqliteModelRepo(sqlite_state_path, SqliteBotState.LAZY_FIELDS)
+        if state_repo.is_empty() and os.path.exists(json_state_path):
+            LoggerUtil.get_logger("AppStarter", "main").info(f"Importing {json_state_path} into {sqlite_state_path}")
+            json_state = JournalModelRepo(json_state_path).load(BotState, BotState())
+            entity_cache.import_entities(json_state.user_cache.values(), json_state.channel_cache.values())
+            entity_cache.flush()
+            import_repo: SqliteModelRepo[BotState] = SqliteModelRepo(sqlite_state_path)
+            import_repo.save(json_state)
+            import_repo.close()
+        self.__shutdown_callbacks.append(state_repo.close)
+        return state_repo
+
     def __get_swynca_admin_provider(self) -> AdminProvider:
         return SwyncaAdminProvider(LoggerUtil.get_logger("AdminProvider", "SwyncaAdminProvider"))
 
@@ -1,14 +1,25 @@
+import os
 from os import getenv
 
 from src.handlers.spam_filters.ChannelSpamFilter.ChannelSpamFilter import ChannelSpamFilter
 from src.handlers.spam_filters.ForwardSpamFilter.ForwardSpamFilter import ForwardSpamFilter
-from src.handlers.spam_filters.OCRFilter import OCRFilter
+from src.handlers.spam_filters.OCRFilter import OCRFilter, OCRMediaType
 from src.handlers.spam_filters.SpamFilter import SpamFilter
+from src.handlers.spam_filters.bayes.BayesSpamFilter import BayesSpamFilter
+from src.handlers.spam_filters.bayes.VerdictLog import VerdictLog
 from src.handlers.spam_filters.lols.LolsSpamFilter import LolsSpamFilter
+from src.handlers.spam_filters.ocr.ImagePreprocessor import ImagePreprocessor
+from src.handlers.spam_filters.ocr.OCREngine import OCREngineType
+from src.handlers.spam_filters.ocr.OCRResultCache import OCRResultCache
+from src.handlers.spam_filters.ocr.OCRWorkerPool import OCRWorkerPool
+from src.handlers.spam_filters.ocr.QRDenyIndex import QRDenyIndex
+from src.handlers.spam_filters.ocr.TelegramFileDownloader import TelegramFileDownloader
 from src.handlers.spam_filters.openai.OpenAIConfig import OpenAIFilterConfig
 from src.handlers.spam_filters.openai.OpenAISpamFilter import OpenAISpamFilter
 from src.handlers.spam_filters.openai.OpenAIWatchdog import OpenAIWatchdog
+from src.util.EnvUtil import get_bool_env, get_float_env, get_int_env
 from src.util.data.BotState import BotState
+from src.util.data.JsonModelRepo import JsonModelRepo
 
 
 class FilterFactory:
@@ -30,13 +41,77 @@ class FilterFactory:
             state: BotState,
             openai_config: OpenAIFilterConfig,
             openai_watchdog: OpenAIWatchdog,
+            data_folder_path: str,
     ) -> SpamFilter:
         """Returns the default chain of spam spam_filters"""
-        tesseract_path = getenv("TESSERACT_PATH", "/usr/bin/tesseract")
-        tesseract_lang = getenv("TESSERACT_LANG", "rus")
         return FilterFactory.Builder(ChannelSpamFilter(state)) \
-            .then(LolsSpamFilter(state)) \
+            .then(LolsSpamFilter(state, os.path.join(data_folder_path, "lols_ban_list.bin"))) \
             .then(ForwardSpamFilter(state)) \
-            .then(OCRFilter(state, tesseract_path, tesseract_lang)) \
-            .then(OpenAISpamFilter(state, openai_config, openai_watchdog)) \
+            .then(OCRFilter(state, FilterFactory.__get_ocr_worker_pool(),
+                            FilterFactory.__get_ocr_result_cache(data_folder_path),
+                            FilterFactory.__get_ocr_file_downloader(),
+                            get_int_env("OCR_MIN_PHOTO_SIDE", 800),
+                            FilterFactory.__get_ocr_max_bytes_by_media_type(),
+                            QRDenyIndex.load(os.path.join(data_folder_path, "qr_deny_list.txt")))) \
+            .then(FilterFactory.__get_bayes_spam_filter(state, data_folder_path)) \
+            .then(OpenAISpamFilter(state, openai_config, openai_watchdog,
+                                   FilterFactory.__get_verdict_log(data_folder_path))) \
             .build()
+
+    @staticmethod
+    def __get_bayes_spam_filter(state: BotState, data_folder_path: str) -> BayesSpamFilter:
+        return BayesSpamFilter(
+            state,
+            os.path.join(data_folder_path, "bayes_model.bin"),
+            spam_threshold=get_float_env("BAYES_SPAM_THRESHOLD", 0.999),
+            not_spam_threshold=get_float_env("BAYES_NOT_SPAM_THRESHOLD", 0.01),
+            min_messages_per_class=get_int_env("BAYES_MIN_MESSAGES_PER_CLASS", 200, min_value=1),
+        )
+
+    @staticmethod
+    def __get_verdict_log(data_folder_path: str) -> VerdictLog | None:
+        if not get_bool_env("BAYES_VERDICT_LOG", False):
+            return None
+        return VerdictLog(os.path.join(data_folder_path, "verdict_log.jsonl"))
+
+    @staticmethod
+    def __get_ocr_worker_pool() -> OCRWorkerPool:
+        preprocessor = ImagePreprocessor(
+            max_image_side=get_int_env("OCR_MAX_IMAGE_SIDE", 2000),
+            binarize=get_bool_env("OCR_BINARIZE", False),
+            min_edge_density=get_float_env("OCR_MIN_EDGE_DENSITY", 0),
+        )
+        return OCRWorkerPool(
+            engine_type=OCREngineType(getenv("OCR_BACKEND", OCREngineType.AUTO)),
+            tesseract_cmd=getenv("TESSERACT_PATH", "/usr/bin/tesseract"),
+            lang=getenv("TESSERACT_LANG", "rus"),
+            preprocessor=preprocessor,
+            workers=get_int_env("OCR_WORKERS", min(4, os.cpu_count() or 1), min_value=1),
+            max_queued_jobs=get_int_env("OCR_MAX_QUEUED_JOBS", 16, min_value=1),
+            job_timeout_sec=get_int_env("OCR_JOB_TIMEOUT_SECONDS", 20, min_value=1),
+            qr_decoding=get_bool_env("OCR_QR_DECODING", True),
+        )
+
+    @staticmethod
+    def __get_ocr_file_downloader() -> TelegramFileDownloader:
+        return TelegramFileDownloader(
+            max_bytes=get_int_env("OCR_MAX_DOWNLOAD_BYTES", 10 * 1024 * 1024, min_value=1),
+            attempts=get_int_env("OCR_DOWNLOAD_ATTEMPTS", 3, min_value=1),
+            diagnostics_enabled=get_bool_env("OCR_DOWNLOAD_DIAGNOSTICS", False),
+        )
+
+    @staticmethod
+    def __get_ocr_max_bytes_by_media_type() -> dict[OCRMediaType, int]:
+        return {
+            OCRMediaType.PHOTO: get_int_env("OCR_MAX_DOWNLOAD_BYTES", 10 * 1024 * 1024, min_value=1),
+            OCRMediaType.DOCUMENT: get_int_env("OCR_MAX_DOCUMENT_BYTES", 5 * 1024 * 1024, min_value=1),
+            OCRMediaType.STICKER: get_int_env("OCR_MAX_STICKER_BYTES", 512 * 1024, min_value=1),
+            OCRMediaType.THUMBNAIL: get_int_env("OCR_MAX_THUMBNAIL_BYTES", 256 * 1024, min_value=1),
+        }
+
+    @staticmethod
+    def __get_ocr_result_cache(data_folder_path: str) -> OCRResultCache:
+        max_entries = get_int_env("OCR_CACHE_MAX_ENTRIES", 10_000, min_value=1)
+        if not get_bool_env("OCR_CACHE_PERSISTENT", False):
+            return OCRResultCache(max_entries)
+        return OCRResultCache(max_entries, JsonModelRepo(os.path.join(data_folder_path, "ocr_cache.json")))
@@ -1,19 +1,48 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, AsyncIterator
 
-import requests
+import httpx
 
 from src.handlers.spam_filters.SpamFilter import SpamFilter
+from src.util.JsonArrayStreamDecoder import JsonArrayStreamDecoder
 
 
 class HTTPJsonSpamFilter(SpamFilter):
     _TIMEOUT_SEC = 5
+    _CONNECT_TIMEOUT_SEC = 2
+    _MAX_CONNECTIONS = 32
+    _MAX_KEEPALIVE_CONNECTIONS = 16
+    _KEEPALIVE_EXPIRY_SEC = 30
+    # Shared by all HTTP filters, so connections to the same host are reused across messages
+    __http_client: httpx.AsyncClient | None = None
 
-    def try_send_request(self, url: str, acceptable_codes: List[int]) -> Dict[str, Any]:
+    @classmethod
+    def _get_http_client(cls) -> httpx.AsyncClient:
+        if HTTPJsonSpamFilter.__http_client is None:
+            HTTPJsonSpamFilter.__http_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(cls._TIMEOUT_SEC, connect=cls._CONNECT_TIMEOUT_SEC),
+                limits=httpx.Limits(
+                    max_connections=cls._MAX_CONNECTIONS,
+                    max_keepalive_connections=cls._MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=cls._KEEPALIVE_EXPIRY_SEC,
+                ),
+            )
+        return HTTPJsonSpamFilter.__http_client
+
+    async def _close(self) -> None:
+        """Closes the shared HTTP client, the first HTTP filter to close it closes it for all of them."""
+        http_client = HTTPJsonSpamFilter.__http_client
+        if http_client is None:
+            return
+        HTTPJsonSpamFilter.__http_client = None
+        await http_client.aclose()
+
+    async def send_request(self, url: str, acceptable_codes: List[int]) -> Dict[str, Any]:
+        """Sends GET request without blocking the event loop. Returns parsed JSON or an empty dict on failure."""
         try:
             self.logger.debug("Sending request to %s", url)
-            response = requests.get(url, timeout=self._TIMEOUT_SEC)
-        except requests.exceptions.RequestException as e:
-            self.logger.error("Request to %s failed: %s", url, e)
+            response = await self._get_http_client().get(url)
+        except httpx.HTTPError as e:
+            self.logger.error("Request to %s failed: %s: %s", url, type(e).__name__, e)
             return {}
         self.logger.debug("Request to %s finished with status code %d and body: %s", url, response.status_code,
                           response.text)
@@ -26,3 +55,20 @@ class HTTPJsonSpamFilter(SpamFilter):
         except ValueError:
             self.logger.error("Failed to parse JSON response from %s: %s", url, response.text)
             return {}
+
+    async def stream_json_array(self, url: str, acceptable_codes: List[int]) -> AsyncIterator[Any]:
+        """
+        Sends GET request and yields items of the JSON array response while it is being downloaded.
+        Raises httpx.HTTPError or ValueError on failure, items yielded before the failure should be discarded.
+        """
+        self.logger.debug("Sending streaming request to %s", url)
+        async with self._get_http_client().stream("GET", url) as response:
+            if response.status_code not in acceptable_codes:
+                await response.aread()
+                raise ValueError(f"Request to {url} failed with status code {response.status_code}. "
+                                 f"Body: {response.text}")
+            decoder = JsonArrayStreamDecoder()
+            async for chunk in response.aiter_text():
+                for item in decoder.feed(chunk):
+                    yield item
+            decoder.close()
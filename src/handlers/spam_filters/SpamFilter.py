@@ -1,7 +1,7 @@
 from typing import Optional
 
 from telegram import Message
-from telegram.ext import CallbackContext
+from telegram.ext import Application, CallbackContext
 
 from src.TelegramHelper import TelegramHelper
 from src.util.LoggerUtil import LoggerUtil
@@ -21,8 +21,41 @@ class SpamFilter:
         self.next_filter = next_filter
         self.telegram_helper = TelegramHelper(self.logger, state)
 
-    async def _is_spam(self, update: EnrichedUpdate, context: CallbackContext) -> bool:
-        """Checks if message is spam. Returns True if message is spam, otherwise False."""
+    def start(self, application: Application) -> None:
+        """Starts background jobs of this filter and all following filters."""
+        self._start(application)
+        if self.next_filter:
+            self.next_filter.start(application)
+
+    def _start(self, application: Application) -> None:
+        """Hook for filters that need background jobs, executed once before the bot starts processing updates."""
+
+    def stop(self) -> None:
+        """Releases resources of this filter and all following filters."""
+        self._stop()
+        if self.next_filter:
+            self.next_filter.stop()
+
+    def _stop(self) -> None:
+        """Hook for filters that own resources, executed once on bot shutdown."""
+
+    async def close(self) -> None:
+        """Releases asynchronous resources of this filter and all following filters."""
+        await self._close()
+        if self.next_filter:
+            await self.next_filter.close()
+
+    async def _close(self) -> None:
+        """
+        Hook for filters that own asynchronous resources, executed once when the bot stops,
+        while its event loop is still running.
+        """
+
+    async def _is_spam(self, update: EnrichedUpdate, context: CallbackContext) -> bool | None:
+        """
+        Checks if message is spam. Returns True if message is spam, otherwise False.
+        Returns None if the message could not be classified: the check stops without trusting the sender.
+        """
         # Implement the spam checking logic here
         raise NotImplementedError("Subclasses should implement this method.")
 
@@ -127,8 +160,15 @@ class SpamFilter:
         self.logger.info(
             "%s Filter check completed: result=%s",
             trace_id,
-            "spam" if is_spam else "passed",
+            "no_verdict" if is_spam is None else "spam" if is_spam else "passed",
         )
+        if is_spam is None:
+            self.logger.info(
+                "%s Spam check completed: result=no_verdict detector=%s, sender is not trusted",
+                trace_id,
+                filter_name,
+            )
+            return
         if is_spam:
             self.logger.info("%s Moderation action started", trace_id)
             try:
@@ -0,0 +1,87 @@
+import os
+from collections import Counter
+
+from telegram.ext import CallbackContext
+
+from src.TelegramHelper import TelegramHelper
+from src.handlers.spam_filters.SpamFilter import SpamFilter
+from src.handlers.spam_filters.bayes.HashedNaiveBayesModel import HashedNaiveBayesModel
+from src.handlers.spam_filters.bayes.VerdictLog import VerdictLog
+from src.telegram.EnrichedUpdate import EnrichedUpdate
+from src.telegram.LocalClassification import LocalClassification, LocalVerdict
+from src.util.data.BotState import BotState
+
+"""
+Classifies messages with a local naive Bayes model before they are sent to OpenAI.
+Messages the model is confident about are reported as spam or marked as not spam, so OpenAI classifies only
+the uncertain rest. Without a trained model every message is uncertain.
+"""
+
+
+class BayesSpamFilter(SpamFilter):
+    _filter_name = "Bayes"
+    __STATS_LOG_INTERVAL = 100
+
+    def __init__(self, state: BotState, model_path: str, spam_threshold: float, not_spam_threshold: float,
+                 min_messages_per_class: int, next_filter: SpamFilter = None):
+        """
+        :param model_path: Model written by `dev/train_bayes_model.py`, a missing file disables the filter.
+        :param spam_threshold: Messages with a higher spam probability are spam, `1` disables spam verdicts.
+        :param not_spam_threshold: Messages with a lower spam probability are not spam, `0` disables such verdicts.
+        :param min_messages_per_class: Models trained on fewer spam or not spam messages are not used.
+        """
+        super().__init__(state, next_filter)
+        self.spam_threshold = spam_threshold
+        self.not_spam_threshold = not_spam_threshold
+        self.model = self.__load_model(model_path, min_messages_per_class)
+        self.__verdicts: Counter[LocalVerdict] = Counter()
+
+    async def _is_spam(self, update: EnrichedUpdate, context: CallbackContext) -> bool:
+        if self.model is None:
+            return False
+        text = VerdictLog.get_text(
+            TelegramHelper.extract_message_text(update.message) or "",
+            "\n\n".join(
+                recognized_photo.ocr_text
+                for recognized_photo in (update.recognized_photos or ())
+                if recognized_photo.ocr_text.strip() != ""
+            ),
+        )
+        if text == "":
+            return False
+        spam_probability = self.model.get_spam_probability(text)
+        if spam_probability > self.spam_threshold:
+            verdict = LocalVerdict.SPAM
+        elif spam_probability < self.not_spam_threshold:
+            verdict = LocalVerdict.NOT_SPAM
+        else:
+            verdict = LocalVerdict.UNCERTAIN
+        update.set_local_classification(LocalClassification(verdict, spam_probability))
+        self.logger.info(f"Local verdict for message {update.message.id}: {verdict} "
+                         f"(spam probability {spam_probability:.4f})")
+        self.__verdicts[verdict] += 1
+        if self.__verdicts.total() % self.__STATS_LOG_INTERVAL == 0:
+            self.logger.info(f"Local verdicts: {self.get_stats()}")
+        return verdict == LocalVerdict.SPAM
+
+    def get_stats(self) -> str:
+        return " ".join(f"{verdict}={self.__verdicts[verdict]}" for verdict in LocalVerdict)
+
+    def __load_model(self, model_path: str, min_messages_per_class: int) -> HashedNaiveBayesModel | None:
+        if not os.path.exists(model_path):
+            self.logger.info(f"Naive Bayes model {model_path} does not exist, all messages are classified by OpenAI")
+            return None
+        try:
+            model = HashedNaiveBayesModel.load(model_path)
+        except (OSError, ValueError) as error:
+            self.logger.warning(f"Failed to load naive Bayes model, all messages are classified by OpenAI: {error}")
+            return None
+        not_spam_messages, spam_messages = model.message_counts
+        if min(model.message_counts) < min_messages_per_class:
+            self.logger.warning(f"Naive Bayes model is trained on {spam_messages} spam and {not_spam_messages} "
+                                f"not spam messages, at least {min_messages_per_class} of each are required; "
+                                f"all messages are classified by OpenAI")
+            return None
+        self.logger.info(f"Loaded naive Bayes model trained on {spam_messages} spam and "
+                         f"{not_spam_messages} not spam messages")
+        return model
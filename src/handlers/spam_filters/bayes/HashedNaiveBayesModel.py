@@ -0,0 +1,131 @@
+import math
+import re
+import struct
+import sys
+import zlib
+from array import array
+
+from src.handlers.spam_filters.openai.TextFingerprint import fold_text
+from src.util.data.JsonModelRepo import write_file_atomically
+
+_WORD = re.compile(r"\w+")
+_SHINGLE_SIZE = 3
+# Long messages are classified by their beginning, which keeps the cost of a prediction bounded
+_MAX_TEXT_LENGTH = 4000
+
+
+class HashedNaiveBayesModel:
+    """
+    Multinomial naive Bayes spam model over hashed text features.
+    Features are words, word pairs and character trigrams of the folded text, hashed into `2 ** feature_bits`
+    buckets, so the model has a fixed size regardless of the vocabulary. Every feature is counted once per message.
+    The model is trained by counting features of messages with known verdicts and can be updated incrementally.
+    """
+    # Magic, byte order of the columns, feature bits, message and feature counts of the not spam and spam classes,
+    # followed by the not spam and spam feature count columns
+    __FILE_HEADER = struct.Struct("<7scBQQQQ")
+    __FILE_MAGIC = b"SPAMNBM"
+    __SMOOTHING = 1.0
+
+    def __init__(
+            self,
+            feature_bits: int = 18,
+            message_counts: list[int] | None = None,
+            feature_totals: list[int] | None = None,
+            feature_counts: tuple[array, array] | None = None,
+    ):
+        """
+        :param feature_bits: Number of hashed feature buckets as a power of two.
+        :param message_counts: Number of learned not spam and spam messages.
+        :param feature_totals: Total feature counts of not spam and spam messages.
+        :param feature_counts: Per-bucket feature counts of not spam and spam messages.
+        """
+        self.feature_bits = feature_bits
+        self.message_counts = message_counts if message_counts is not None else [0, 0]
+        self.feature_totals = feature_totals if feature_totals is not None else [0, 0]
+        if feature_counts is None:
+            feature_counts = (array('I', [0]) * (1 << feature_bits), array('I', [0]) * (1 << feature_bits))
+        self.feature_counts = feature_counts
+        self.__log_ratios: array | None = None
+
+    def learn(self, text: str, is_spam: bool) -> None:
+        label = int(is_spam)
+        features = self.extract_features(text)
+        counts = self.feature_counts[label]
+        for feature in features:
+            counts[feature] += 1
+        self.message_counts[label] += 1
+        self.feature_totals[label] += len(features)
+        self.__log_ratios = None
+
+    def get_spam_probability(self, text: str) -> float:
+        """Returns the probability of the text being spam, 0.5 for a model without messages of both classes."""
+        if min(self.message_counts) == 0:
+            return 0.5
+        if self.__log_ratios is None:
+            self.__log_ratios = self.__get_log_ratios()
+        log_ratios = self.__log_ratios
+        log_odds = math.log(self.message_counts[1] / self.message_counts[0])
+        log_odds += math.fsum(log_ratios[feature] for feature in self.extract_features(text))
+        # math.exp overflows for larger arguments
+        if log_odds < -700:
+            return 0.0
+        return 1 / (1 + math.exp(-log_odds))
+
+    def extract_features(self, text: str) -> set[int]:
+        folded = fold_text(text[:_MAX_TEXT_LENGTH])
+        words = _WORD.findall(folded)
+        letters = "".join(words)
+        tokens = [f"w {word}" for word in words]
+        tokens.extend(f"p {first} {second}" for first, second in zip(words, words[1:]))
+        tokens.extend(f"c {letters[i:i + _SHINGLE_SIZE]}" for i in range(len(letters) - _SHINGLE_SIZE + 1))
+        mask = (1 << self.feature_bits) - 1
+        return {zlib.crc32(token.encode("utf-8")) & mask for token in tokens}
+
+    def __get_log_ratios(self) -> array:
+        """Spam to not spam log likelihood ratio of every feature bucket, so a prediction only sums table lookups."""
+        not_spam_counts, spam_counts = self.feature_counts
+        vocabulary_size = self.__SMOOTHING * len(spam_counts)
+        log_normalizer = math.log(
+            (self.feature_totals[0] + vocabulary_size) / (self.feature_totals[1] + vocabulary_size)
+        )
+        return array('d', (
+            math.log((spam_count + self.__SMOOTHING) / (not_spam_count + self.__SMOOTHING)) + log_normalizer
+            for not_spam_count, spam_count in zip(not_spam_counts, spam_counts)
+        ))
+
+    def save(self, file_path: str) -> None:
+        """Writes the model to a binary file that can be read by load()."""
+        header = self.__FILE_HEADER.pack(
+            self.__FILE_MAGIC,
+            sys.byteorder[0].encode(),
+            self.feature_bits,
+            *self.message_counts,
+            *self.feature_totals,
+        )
+        write_file_atomically(file_path, header + self.feature_counts[0].tobytes() + self.feature_counts[1].tobytes())
+
+    @classmethod
+    def load(cls, file_path: str) -> 'HashedNaiveBayesModel':
+        """
+        Reads a model written by save().
+        Raises OSError if the file cannot be read and ValueError if it is not a valid model.
+        """
+        with open(file_path, 'rb') as f:
+            content = f.read()
+        header_size = cls.__FILE_HEADER.size
+        if len(content) < header_size:
+            raise ValueError(f"{file_path} is too short to be a naive Bayes model")
+        magic, byte_order, feature_bits, *counts = cls.__FILE_HEADER.unpack_from(content)
+        if magic != cls.__FILE_MAGIC:
+            raise ValueError(f"{file_path} is not a naive Bayes model")
+        if byte_order != sys.byteorder[0].encode():
+            raise ValueError(f"{file_path} was written on a machine with another byte order")
+        column_size = array('I').itemsize << feature_bits
+        if len(content) != header_size + 2 * column_size:
+            raise ValueError(f"{file_path} has unexpected size for {feature_bits} feature bits")
+        not_spam_counts = array('I')
+        not_spam_counts.frombytes(content[header_size:header_size + column_size])
+        spam_counts = array('I')
+        spam_counts.frombytes(content[header_size + column_size:])
+        return cls(feature_bits, counts[:2], counts[2:], (not_spam_counts, spam_counts))
@@ -0,0 +1,45 @@
+import json
+import os
+from collections.abc import Iterator
+from datetime import datetime, timezone
+
+from src.util.LoggerUtil import LoggerUtil
+
+
+class VerdictLog:
+    """
+    Append-only JSON lines log of OpenAI verdicts, used as training data of the local naive Bayes model.
+    Every line stores the classified text, the verdict and the time it was made.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.logger = LoggerUtil.get_logger("VerdictLog", "Bayes")
+
+    @staticmethod
+    def get_text(target_message: str, attachment_transcript: str) -> str:
+        """Text of a message as seen by the local classifier: the message text followed by recognized images."""
+        return "\n\n".join(part for part in (target_message, attachment_transcript) if part.strip() != "")
+
+    def append(self, text: str, verdict: str) -> None:
+        if text.strip() == "":
+            return
+        record = {"created_at": datetime.now(timezone.utc).isoformat(), "verdict": verdict, "text": text}
+        try:
+            with open(self.file_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as error:
+            self.logger.warning(f"Failed to append to verdict log {self.file_path}: {error}")
+
+    @staticmethod
+    def read(file_path: str) -> Iterator[tuple[str, str]]:
+        """Yields (text, verdict) pairs, skipping malformed lines. A missing file is an empty log."""
+        if not os.path.exists(file_path):
+            return
+        with open(file_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    yield record["text"], record["verdict"]
+                except (ValueError, KeyError, TypeError):
+                    continue
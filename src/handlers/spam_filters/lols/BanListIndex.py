@@ -0,0 +1,109 @@
+import mmap
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Sequence
+
+from src.util.data.JsonModelRepo import write_file_atomically
+
+
+class BanListIndex:
+    """
+    Immutable merged index of banned user ids from all downloaded ban lists.
+    Ids are kept in a sorted int64 array with a parallel column of expiration timestamps,
+    so a lookup is a single binary search and every entry takes 16 bytes.
+    The same layout is used on disk, so a saved index is loaded by memory-mapping the file.
+    """
+    # Magic, byte order of the columns and number of entries, followed by the id and expiration columns
+    __FILE_HEADER = struct.Struct("<7scQ")
+    __FILE_MAGIC = b"LOLSIDX"
+
+    def __init__(self, user_ids: Sequence[int] | None = None, expires_at: Sequence[int] | None = None):
+        self.user_ids = user_ids if user_ids is not None else array('q')
+        self.expires_at = expires_at if expires_at is not None else array('q')
+        if len(self.user_ids) != len(self.expires_at):
+            raise ValueError("user_ids and expires_at must have the same length")
+
+    def contains(self, user_id: int, now: float | None = None) -> bool:
+        """Checks if user is in any ban list that has not expired yet."""
+        index = bisect_left(self.user_ids, user_id)
+        if index == len(self.user_ids) or self.user_ids[index] != user_id:
+            return False
+        return self.expires_at[index] > (time.time() if now is None else now)
+
+    def merged(self, banned_ids: Iterable[int], expires_at: int, now: float | None = None) -> 'BanListIndex':
+        """
+        Build a new index with ids from a freshly downloaded ban list.
+        Ids present in the new list get the new expiration time, expired entries are dropped.
+        :param banned_ids: Ids from the downloaded ban list.
+        :param expires_at: Expiration timestamp of the downloaded ban list entries.
+        :param now: Current timestamp.
+        """
+        now = time.time() if now is None else now
+        new_ids = array('q', sorted(set(banned_ids)))
+        merged_ids = array('q')
+        merged_expires_at = array('q')
+        old_ids = self.user_ids
+        old_expires_at = self.expires_at
+        old_index = 0
+        new_index = 0
+        # Linear merge of two sorted arrays, the newer expiration time wins for ids present in both
+        while old_index < len(old_ids) and new_index < len(new_ids):
+            old_id = old_ids[old_index]
+            new_id = new_ids[new_index]
+            if old_id < new_id:
+                if old_expires_at[old_index] > now:
+                    merged_ids.append(old_id)
+                    merged_expires_at.append(old_expires_at[old_index])
+                old_index += 1
+            else:
+                merged_ids.append(new_id)
+                merged_expires_at.append(max(expires_at, old_expires_at[old_index]) if old_id == new_id
+                                         else expires_at)
+                new_index += 1
+                if old_id == new_id:
+                    old_index += 1
+        for index in range(old_index, len(old_ids)):
+            if old_expires_at[index] > now:
+                merged_ids.append(old_ids[index])
+                merged_expires_at.append(old_expires_at[index])
+        remaining_ids = new_ids[new_index:]
+        merged_ids.extend(remaining_ids)
+        merged_expires_at.extend(array('q', [expires_at]) * len(remaining_ids))
+        return BanListIndex(merged_ids, merged_expires_at)
+
+    def save(self, file_path: str) -> None:
+        """Write the index to a binary file that can be memory-mapped by load()."""
+        header = self.__FILE_HEADER.pack(self.__FILE_MAGIC, sys.byteorder[0].encode(), len(self.user_ids))
+        write_file_atomically(file_path, header + self.user_ids.tobytes() + self.expires_at.tobytes())
+
+    @classmethod
+    def load(cls, file_path: str) -> 'BanListIndex':
+        """
+        Memory-map an index written by save(). Pages are read lazily by the OS, so loading takes constant time.
+        Raises OSError if the file cannot be read and ValueError if it is not a valid index.
+        """
+        with open(file_path, 'rb') as f:
+            file_mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header_size = cls.__FILE_HEADER.size
+        if len(file_mmap) < header_size:
+            raise ValueError(f"{file_path} is too short to be a ban list index")
+        magic, byte_order, entries = cls.__FILE_HEADER.unpack_from(file_mmap)
+        if magic != cls.__FILE_MAGIC:
+            raise ValueError(f"{file_path} is not a ban list index")
+        if byte_order != sys.byteorder[0].encode():
+            raise ValueError(f"{file_path} was written on a machine with another byte order")
+        column_size = entries * array('q').itemsize
+        if len(file_mmap) != header_size + 2 * column_size:
+            raise ValueError(f"{file_path} has unexpected size for {entries} entries")
+        # The memory views keep the mapping open for as long as the index is used
+        file_view = memoryview(file_mmap)
+        return cls(
+            file_view[header_size:header_size + column_size].cast('q'),
+            file_view[header_size + column_size:].cast('q'),
+        )
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
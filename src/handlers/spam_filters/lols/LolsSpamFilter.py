@@ -1,11 +1,17 @@
+import asyncio
+import os
 import time
-from threading import Timer
-from typing import Dict
+from array import array
 
+import httpx
 from telegram import MessageOriginChat, Update
-from telegram.ext import CallbackContext
+from telegram.ext import Application, CallbackContext, Job
 
 from src.handlers.spam_filters.HTTPJsonSpamFilter import HTTPJsonSpamFilter
+from src.handlers.spam_filters.lols.BanListIndex import BanListIndex
+from src.util.EnvUtil import get_int_env
+from src.util.cache.LRUCache import LRUCache
+from src.util.cache.SingleFlight import SingleFlight
 from src.util.data.BotState import BotState
 
 
@@ -17,20 +23,44 @@ class LolsSpamFilter(HTTPJsonSpamFilter):
     __CACHE_UPDATE_INTERVAL_SEC = 60 * 60
     __CACHE_MAX_AGE_SEC = 60 * 60 * 72
     __CACHE_LIST_NAME = "spammers-1h"
-    __CACHE_LIST_REQUESTS_BY_TIMESTAMP: Dict[float, set[int]] = {}
+    __VERDICT_CACHE_MAX_ENTRIES = 100_000
+    __DEFAULT_BANNED_VERDICT_TTL_SEC = 60 * 60 * 24
+    __DEFAULT_CLEAN_VERDICT_TTL_SEC = 60 * 60
+    __VERDICT_STATS_LOG_INTERVAL = 100
 
     _filter_name = "Lols"
 
-    def __init__(self, state: BotState):
+    def __init__(self, state: BotState, ban_list_path: str | None = None):
         super().__init__(state)
-        self.__schedule_cache_update()
+        self.__ban_list_path = ban_list_path
+        self.__banned_verdict_ttl_sec = get_int_env("LOLS_BANNED_VERDICT_TTL_SECONDS",
+                                                    self.__DEFAULT_BANNED_VERDICT_TTL_SEC)
+        self.__clean_verdict_ttl_sec = get_int_env("LOLS_CLEAN_VERDICT_TTL_SECONDS",
+                                                   self.__DEFAULT_CLEAN_VERDICT_TTL_SEC)
+        self.__verdict_cache: LRUCache[int, bool] = LRUCache(self.__VERDICT_CACHE_MAX_ENTRIES)
+        self.__account_requests: SingleFlight[int, bool | None] = SingleFlight()
+        self.__ban_list_index = self.__load_ban_list_index()
+        self.__cache_update_job: Job | None = None
+
+    def _start(self, application: Application) -> None:
+        if self.__cache_update_job is not None:
+            return
+        if application.job_queue is None:
+            raise ValueError("Job queue is not configured")
+        # The first download runs in the background, so startup does not wait for lols.bot
+        self.__cache_update_job = application.job_queue.run_repeating(
+            callback=self.__update_cache_job,
+            interval=self.__CACHE_UPDATE_INTERVAL_SEC,
+            first=0,
+            name="lols-ban-list-update",
+        )
 
     async def _is_spam(self, update: Update, context: CallbackContext) -> bool:
         """Checks if message is spam. Returns true if message is spam"""
         message_author = self.telegram_helper.extract_message_user(update.message)
         if message_author is None:
             return False
-        return self.is_spam(message_author.id)
+        return await self.is_spam(message_author.id)
 
     async def _on_spam(self, update: Update, context: CallbackContext) -> None:
         reposted_group_id = self.__get_reposted_group_id(update)
@@ -39,33 +69,48 @@ class LolsSpamFilter(HTTPJsonSpamFilter):
             self.state.ban_channel(reposted_group_id)
         await super()._on_spam(update, context)
 
-    def is_spam(self, user_id: int) -> bool:
+    async def is_spam(self, user_id: int) -> bool:
         if self.__is_in_cache(user_id):
             self.logger.info(f"User {user_id} is in cache")
             return True
+        is_banned = self.__verdict_cache.get(user_id)
+        if is_banned is not None:
+            self.logger.info(f"User {user_id} has cached verdict: banned={is_banned}")
+            return is_banned
+        is_banned = await self.__account_requests.run(user_id, lambda: self.__request_account_status(user_id))
+        self.__log_verdict_stats()
+        return bool(is_banned)
+
+    async def __request_account_status(self, user_id: int) -> bool | None:
         request_url = self.__LOLS_CHECK_API + str(user_id)
-        account_status = self.try_send_request(request_url, [200])
+        account_status = await self.send_request(request_url, [200])
         if not account_status:
-            return False
+            return None
         self.logger.info(f"User {user_id}: {account_status}")
-        return account_status['banned']
+        is_banned = bool(account_status['banned'])
+        # Failed requests are not cached, so the next message of the user is checked again
+        ttl_sec = self.__banned_verdict_ttl_sec if is_banned else self.__clean_verdict_ttl_sec
+        if ttl_sec > 0:
+            self.__verdict_cache.put(user_id, is_banned, ttl_seconds=ttl_sec)
+        return is_banned
 
-    def __schedule_cache_update(self):
-        self.__invalidate_outdated_cache()
-        self.__update_cache()
-        timer: Timer = Timer(self.__CACHE_UPDATE_INTERVAL_SEC, self.__schedule_cache_update)
-        timer.daemon = True
-        timer.start()
+    def __log_verdict_stats(self):
+        if self.__account_requests.calls % self.__VERDICT_STATS_LOG_INTERVAL == 0:
+            self.logger.info(f"Account verdict cache: {self.__verdict_cache.get_stats()}; "
+                             f"account requests: {self.__account_requests.get_stats()}")
 
     def __is_in_cache(self, user_id: int) -> bool:
-        for banned_ids_list in self.__CACHE_LIST_REQUESTS_BY_TIMESTAMP.values():
-            if user_id in banned_ids_list:
-                return True
-        return False
+        return self.__ban_list_index.contains(user_id)
+
+    async def __update_cache_job(self, context: CallbackContext) -> None:
+        try:
+            await self.__update_cache()
+        except (httpx.HTTPError, ValueError, KeyError, TypeError) as e:
+            self.logger.error(f"Failed to update cache for {self.__CACHE_LIST_NAME}: {type(e).__name__}: {e}")
 
-    def __update_cache(self):
+    async def __update_cache(self) -> None:
         self.logger.info(f"Updating cache for {self.__CACHE_LIST_NAME}")
-        lists_mappings = self.try_send_request(self.__LOLS_GET_BANNED_IDS_API, [200])
+        lists_mappings = await self.send_request(self.__LOLS_GET_BANNED_IDS_API, [200])
         lists_mapping = None
         for lists_mapping_candidate in lists_mappings:
             if lists_mapping_candidate['id'] == self.__CACHE_LIST_NAME:
@@ -75,18 +120,41 @@ class LolsSpamFilter(HTTPJsonSpamFilter):
             self.logger.error(f"List {self.__CACHE_LIST_NAME} not found in {lists_mappings}. Passing")
             return
         list_url = lists_mapping['format']['json']
-        banned_ids = self.try_send_request(list_url, [200])
-        banned_ids = set([int(user_id) for user_id in banned_ids])
+        # Ids are collected into a compact array while the list is still downloading
+        banned_ids = array('q')
+        async for user_id in self.stream_json_array(list_url, [200]):
+            banned_ids.append(int(user_id))
         updated_at = time.time()
-        self.__CACHE_LIST_REQUESTS_BY_TIMESTAMP[updated_at] = banned_ids
-        self.logger.info(f"Cache updated at {updated_at} with {len(banned_ids)} banned ids")
-
-    def __invalidate_outdated_cache(self):
-        current_time = time.time()
-        for timestamp in list(self.__CACHE_LIST_REQUESTS_BY_TIMESTAMP.keys()):
-            if current_time - timestamp > self.__CACHE_MAX_AGE_SEC:
-                self.logger.debug(f"Invalidating cache for {self.__CACHE_LIST_NAME} at {timestamp}")
-                del self.__CACHE_LIST_REQUESTS_BY_TIMESTAMP[timestamp]
+        ban_list_index = await asyncio.to_thread(
+            self.__merge_ban_list_index,
+            banned_ids,
+            int(updated_at + self.__CACHE_MAX_AGE_SEC),
+            updated_at,
+        )
+        # The merged index is replaced as a whole, so readers always see a complete index
+        self.__ban_list_index = ban_list_index
+        self.logger.info(f"Cache updated at {updated_at} with {len(banned_ids)} banned ids, "
+                         f"{len(ban_list_index)} ids in total")
+
+    def __merge_ban_list_index(self, banned_ids: array, expires_at: int, now: float) -> BanListIndex:
+        ban_list_index = self.__ban_list_index.merged(banned_ids, expires_at=expires_at, now=now)
+        if self.__ban_list_path is not None:
+            try:
+                ban_list_index.save(self.__ban_list_path)
+            except OSError as e:
+                self.logger.error(f"Failed to save ban list index to {self.__ban_list_path}: {e}")
+        return ban_list_index
+
+    def __load_ban_list_index(self) -> BanListIndex:
+        if self.__ban_list_path is None or not os.path.exists(self.__ban_list_path):
+            return BanListIndex()
+        try:
+            ban_list_index = BanListIndex.load(self.__ban_list_path)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Failed to load ban list index from {self.__ban_list_path}, starting empty: {e}")
+            return BanListIndex()
+        self.logger.info(f"Loaded {len(ban_list_index)} banned ids from {self.__ban_list_path}")
+        return ban_list_index
 
     @staticmethod
     def __get_reposted_group_id(update: Update) -> int | None:
@@ -0,0 +1,27 @@
+import io
+
+from PIL import Image, UnidentifiedImageError
+
+_HASH_SIZE = 8
+
+
+def get_difference_hash(image_bytes: bytes) -> int | None:
+    """
+    Computes 64-bit difference hash (dHash) of an image: the image is reduced to 9x8 greyscale pixels
+    and every bit tells whether a pixel is brighter than its right neighbour.
+    Re-encoded, resized or slightly recompressed copies of an image get the same hash.
+    Returns None if the image cannot be decoded.
+    """
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        # JPEG images are decoded directly at a reduced scale, which is much faster than a full decode
+        image.draft("L", (_HASH_SIZE * 8, _HASH_SIZE * 8))
+        pixels = image.convert("L").resize((_HASH_SIZE + 1, _HASH_SIZE), Image.Resampling.LANCZOS).tobytes()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError):
+        return None
+    image_hash = 0
+    for row in range(_HASH_SIZE):
+        row_offset = row * (_HASH_SIZE + 1)
+        for column in range(_HASH_SIZE):
+            image_hash = (image_hash << 1) | (pixels[row_offset + column] > pixels[row_offset + column + 1])
+    return image_hash
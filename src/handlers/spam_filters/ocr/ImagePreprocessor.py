@@ -0,0 +1,78 @@
+from PIL import Image, ImageFilter, ImageOps
+
+
+class ImagePreprocessor:
+    """
+    Prepares images for OCR: converts them to greyscale, downsamples large images and binarizes them,
+    so tesseract processes fewer pixels with less noise.
+    Images with too few edges are very unlikely to contain text and may be skipped entirely.
+    """
+    __EDGE_SAMPLE_SIDE = 256
+    __EDGE_THRESHOLD = 64
+
+    def __init__(self, max_image_side: int, binarize: bool, min_edge_density: float):
+        """
+        :param max_image_side: Images with a longer side are downsampled to it, 0 disables downsampling.
+        :param binarize: Convert image to black and white using a global Otsu threshold.
+        :param min_edge_density: Minimal share of edge pixels for an image to be recognized, 0 disables the check.
+        """
+        self.max_image_side = max_image_side
+        self.binarize = binarize
+        self.min_edge_density = min_edge_density
+
+    def preprocess(self, image: Image.Image) -> Image.Image | None:
+        """Returns image prepared for OCR, or None if the image is unlikely to contain text."""
+        image = self.__flatten_transparency(ImageOps.exif_transpose(image)).convert("L")
+        if self.min_edge_density > 0 and self.get_edge_density(image) < self.min_edge_density:
+            return None
+        if self.max_image_side > 0 and max(image.size) > self.max_image_side:
+            image.thumbnail((self.max_image_side, self.max_image_side), Image.Resampling.LANCZOS)
+        if self.binarize:
+            threshold = self.__get_otsu_threshold(image.histogram())
+            image = image.point([255 if value > threshold else 0 for value in range(256)])
+        return image
+
+    def get_edge_density(self, image: Image.Image) -> float:
+        """Share of pixels on sharp brightness edges, measured on a reduced copy of a greyscale image."""
+        sample = image.copy()
+        sample.thumbnail((self.__EDGE_SAMPLE_SIDE, self.__EDGE_SAMPLE_SIDE), Image.Resampling.BILINEAR)
+        edges = sample.filter(ImageFilter.FIND_EDGES)
+        histogram = edges.histogram()
+        total_pixels = sum(histogram)
+        if total_pixels == 0:
+            return 0.0
+        return sum(histogram[self.__EDGE_THRESHOLD:]) / total_pixels
+
+    @staticmethod
+    def __flatten_transparency(image: Image.Image) -> Image.Image:
+        """Puts transparent images, e.g. stickers, on a white background, so transparent pixels do not hide text."""
+        if image.mode == "P" and "transparency" in image.info:
+            image = image.convert("RGBA")
+        if image.mode not in ("RGBA", "LA"):
+            return image
+        background = Image.new("RGBA", image.size, (255, 255, 255, 255))
+        return Image.alpha_composite(background, image.convert("RGBA"))
+
+    @staticmethod
+    def __get_otsu_threshold(histogram: list[int]) -> int:
+        total_pixels = sum(histogram)
+        total_brightness = sum(value * count for value, count in enumerate(histogram))
+        background_pixels = 0
+        background_brightness = 0
+        best_threshold = 127
+        best_variance = 0.0
+        for value, count in enumerate(histogram):
+            background_pixels += count
+            if background_pixels == 0:
+                continue
+            foreground_pixels = total_pixels - background_pixels
+            if foreground_pixels == 0:
+                break
+            background_brightness += value * count
+            background_mean = background_brightness / background_pixels
+            foreground_mean = (total_brightness - background_brightness) / foreground_pixels
+            variance = background_pixels * foreground_pixels * (background_mean - foreground_mean) ** 2
+            if variance > best_variance:
+                best_variance = variance
+                best_threshold = value
+        return best_threshold
@@ -0,0 +1,34 @@
+import importlib.util
+from enum import StrEnum
+
+from PIL import Image
+
+
+class OCREngineType(StrEnum):
+    AUTO = "auto"
+    PYTESSERACT = "pytesseract"
+    TESSEROCR = "tesserocr"
+
+    def resolve(self) -> 'OCREngineType':
+        """Resolves AUTO and TESSEROCR to tesserocr when the binding is installed and to pytesseract otherwise."""
+        if self == OCREngineType.PYTESSERACT:
+            return self
+        if importlib.util.find_spec("tesserocr") is not None:
+            return OCREngineType.TESSEROCR
+        return OCREngineType.PYTESSERACT
+
+
+class OCREngine:
+    """Text recognizer living in an OCR worker process."""
+
+    def recognize(self, image: Image.Image) -> str:
+        raise NotImplementedError("Subclasses should implement this method.")
+
+    @staticmethod
+    def create(engine_type: OCREngineType, tesseract_cmd: str | None, lang: str, timeout_sec: float) -> 'OCREngine':
+        engine_type = engine_type.resolve()
+        if engine_type == OCREngineType.TESSEROCR:
+            from src.handlers.spam_filters.ocr.TesserocrEngine import TesserocrEngine
+            return TesserocrEngine(lang, timeout_sec)
+        from src.handlers.spam_filters.ocr.PytesseractEngine import PytesseractEngine
+        return PytesseractEngine(tesseract_cmd, lang, timeout_sec)
@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+
+
+class OCRResult(BaseModel):
+    """
+    Recognition result of one image. Decoded QR code payloads are kept apart from the recognized text,
+    so text printed in an image can never be taken for a decoded QR code.
+    """
+    text: str = ""
+    qr_payloads: list[str] = []
+
+    def get_transcript(self) -> str:
+        """Text passed to the classifier: the recognized text followed by the decoded QR code payloads."""
+        if not self.qr_payloads:
+            return self.text
+        lines = [self.text.rstrip()] if self.text.strip() else []
+        lines.extend(f"QR code: {payload}" for payload in self.qr_payloads)
+        return "\n".join(lines)
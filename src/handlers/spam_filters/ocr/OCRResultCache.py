@@ -0,0 +1,101 @@
+import asyncio
+
+from pydantic import BaseModel
+from telegram.ext import Application, CallbackContext, Job
+
+from src.handlers.spam_filters.ocr.OCRResult import OCRResult
+from src.util.LoggerUtil import LoggerUtil
+from src.util.cache.LRUCache import LRUCache
+from src.util.data.ModelRepo import ModelRepo
+
+
+class OCRResultCacheSnapshot(BaseModel):
+    """Cache entries from least to most recently used, plain texts were stored by previous versions."""
+    texts_by_file_unique_id: list[tuple[str, OCRResult | str]] = []
+    texts_by_image_hash: list[tuple[int, OCRResult | str]] = []
+
+
+class OCRResultCache:
+    """
+    Recognized image texts and QR codes keyed by Telegram file_unique_id and by perceptual image hash.
+    The file_unique_id lookup happens before download, so reposts of the same file skip both download and OCR;
+    the hash lookup happens after download and catches re-uploaded or re-encoded copies of an image.
+    """
+    _FLUSH_INTERVAL_SECONDS = 60
+
+    def __init__(self, max_entries: int, cache_repo: ModelRepo[OCRResultCacheSnapshot] | None = None):
+        self.cache_repo = cache_repo
+        self.logger = LoggerUtil.get_logger("OCRResultCache", "OCR")
+        self.texts_by_file_unique_id: LRUCache[str, OCRResult] = LRUCache(max_entries)
+        self.texts_by_image_hash: LRUCache[int, OCRResult] = LRUCache(max_entries)
+        self._dirty = False
+        self._job: Job | None = None
+        if cache_repo is not None:
+            self._load()
+
+    def start(self, application: Application) -> None:
+        if self._job is not None:
+            return
+        if application.job_queue is None:
+            raise ValueError("Job queue is not configured")
+        self._job = application.job_queue.run_repeating(
+            callback=self._flush_job,
+            interval=self._FLUSH_INTERVAL_SECONDS,
+            first=self._FLUSH_INTERVAL_SECONDS,
+            name="ocr-result-cache-flush",
+        )
+
+    def get_by_file_unique_id(self, file_unique_id: str) -> OCRResult | None:
+        return self.texts_by_file_unique_id.get(file_unique_id)
+
+    def get_by_image_hash(self, file_unique_id: str, image_hash: int) -> OCRResult | None:
+        """Looks up result by image hash and remembers it for the file_unique_id on hit."""
+        result = self.texts_by_image_hash.get(image_hash)
+        if result is not None:
+            self.texts_by_file_unique_id.put(file_unique_id, result)
+            self._dirty = True
+        return result
+
+    def put(self, file_unique_id: str, image_hash: int | None, result: OCRResult) -> None:
+        self.texts_by_file_unique_id.put(file_unique_id, result)
+        if image_hash is not None:
+            self.texts_by_image_hash.put(image_hash, result)
+        self._dirty = True
+
+    def get_stats(self) -> str:
+        return (f"by file_unique_id: {self.texts_by_file_unique_id.get_stats()}; "
+                f"by image hash: {self.texts_by_image_hash.get_stats()}")
+
+    def flush(self) -> None:
+        """Write cached texts if persistence is enabled and they have changed since the last flush."""
+        if self.cache_repo is None or not self._dirty:
+            return
+        self._dirty = False
+        self.cache_repo.save(self._get_snapshot())
+
+    async def _flush_job(self, context: CallbackContext) -> None:
+        self.logger.debug(f"OCR result cache: {self.get_stats()}")
+        if self.cache_repo is None or not self._dirty:
+            return
+        self._dirty = False
+        # The snapshot is taken on the event loop, so only serialization and disk I/O run in the worker thread
+        await asyncio.to_thread(self.cache_repo.save, self._get_snapshot())
+
+    def _get_snapshot(self) -> OCRResultCacheSnapshot:
+        return OCRResultCacheSnapshot.model_construct(
+            texts_by_file_unique_id=[(key, result) for key, result, _ in self.texts_by_file_unique_id.items()],
+            texts_by_image_hash=[(key, result) for key, result, _ in self.texts_by_image_hash.items()],
+        )
+
+    def _load(self) -> None:
+        snapshot = self.cache_repo.load(OCRResultCacheSnapshot, OCRResultCacheSnapshot())
+        for file_unique_id, result in snapshot.texts_by_file_unique_id:
+            self.texts_by_file_unique_id.put(file_unique_id, self.__to_result(result))
+        for image_hash, result in snapshot.texts_by_image_hash:
+            self.texts_by_image_hash.put(image_hash, self.__to_result(result))
+        self.logger.info(f"Loaded OCR result cache: files={len(self.texts_by_file_unique_id)} "
+                         f"image_hashes={len(self.texts_by_image_hash)}")
+
+    @staticmethod
+    def __to_result(result: OCRResult | str) -> OCRResult:
+        return OCRResult(text=result) if isinstance(result, str) else result
@@ -0,0 +1,141 @@
+import asyncio
+import io
+import multiprocessing
+import signal
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from PIL import Image, UnidentifiedImageError
+from pytesseract import TesseractNotFoundError, TesseractError
+
+from src.handlers.spam_filters.ocr.ImagePreprocessor import ImagePreprocessor
+from src.handlers.spam_filters.ocr.OCREngine import OCREngine, OCREngineType
+from src.handlers.spam_filters.ocr.OCRResult import OCRResult
+from src.handlers.spam_filters.ocr.QRCodeDecoder import QRCodeDecoder
+from src.util.LoggerUtil import LoggerUtil
+
+# Worker process state, created once by the pool initializer
+_worker_engine: OCREngine | None = None
+_worker_preprocessor: ImagePreprocessor | None = None
+_worker_qr_decoder: QRCodeDecoder | None = None
+_worker_job_deadline_sec: float = 0
+
+
+class OCRWorkerError(Exception):
+    pass
+
+
+def _init_worker(engine_type: OCREngineType, tesseract_cmd: str | None, lang: str, timeout_sec: float,
+                 preprocessor: ImagePreprocessor, qr_decoding: bool, job_deadline_sec: float) -> None:
+    global _worker_engine, _worker_preprocessor, _worker_qr_decoder, _worker_job_deadline_sec
+    _worker_engine = OCREngine.create(engine_type, tesseract_cmd, lang, timeout_sec)
+    _worker_preprocessor = preprocessor
+    _worker_qr_decoder = QRCodeDecoder() if qr_decoding else None
+    # SIGALRM is not handled, so a job still running at the deadline terminates the worker process
+    _worker_job_deadline_sec = job_deadline_sec if hasattr(signal, "setitimer") else 0
+
+
+def _recognize(image_bytes: bytes) -> OCRResult:
+    # Library exceptions are not always picklable, so they are sent back to the bot process as a message
+    if _worker_job_deadline_sec > 0:
+        signal.setitimer(signal.ITIMER_REAL, _worker_job_deadline_sec)
+    try:
+        source_image = Image.open(io.BytesIO(image_bytes))
+        # QR codes are decoded from the original image, binarization and downsampling may break them
+        qr_payloads = [] if _worker_qr_decoder is None else _worker_qr_decoder.decode(source_image)
+        image = _worker_preprocessor.preprocess(source_image)
+        text = "" if image is None else _worker_engine.recognize(image)
+        return OCRResult(text=text, qr_payloads=qr_payloads)
+    except (TesseractNotFoundError, TesseractError, UnidentifiedImageError, Image.DecompressionBombError, OSError,
+            RuntimeError, ValueError) as e:
+        raise OCRWorkerError(f"{type(e).__name__}: {e}") from None
+    finally:
+        if _worker_job_deadline_sec > 0:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+class OCRWorkerPool:
+    """
+    Runs Tesseract in worker processes, so image recognition never blocks the event loop
+    and images from different messages are recognized in parallel.
+    At most `workers + max_queued_jobs` images are accepted at a time; further callers wait for a free slot
+    up to the job timeout and are skipped if none becomes available.
+    Tesserocr cannot be interrupted, so a worker whose job outlives the job deadline is terminated,
+    which breaks the pool; the pool is then restarted and the slots of all its jobs are released.
+    """
+    # Recognition itself is limited by the job timeout, the deadline only stops jobs stuck in native code
+    __JOB_DEADLINE_FACTOR = 2
+
+    def __init__(self, engine_type: OCREngineType, tesseract_cmd: str | None, lang: str,
+                 preprocessor: ImagePreprocessor, workers: int, max_queued_jobs: int, job_timeout_sec: float,
+                 qr_decoding: bool = False):
+        self.engine_type = engine_type.resolve()
+        self.tesseract_cmd = tesseract_cmd
+        self.lang = lang
+        self.preprocessor = preprocessor
+        self.workers = workers
+        self.job_timeout_sec = job_timeout_sec
+        self.logger = LoggerUtil.get_logger("OCRWorkerPool", "OCR")
+        if engine_type == OCREngineType.TESSEROCR and self.engine_type != OCREngineType.TESSEROCR:
+            self.logger.warning("tesserocr is not installed, falling back to pytesseract")
+        self.qr_decoding = qr_decoding and QRCodeDecoder.is_available()
+        if qr_decoding and not self.qr_decoding:
+            self.logger.warning("pyzbar or the zbar library is not installed, QR codes will not be decoded")
+        self.logger.info(f"Using {self.engine_type} OCR engine with {workers} worker(s), "
+                         f"QR decoding {'enabled' if self.qr_decoding else 'disabled'}")
+        self._slots = asyncio.Semaphore(workers + max_queued_jobs)
+        self._executor = self._create_executor()
+
+    async def recognize(self, image_bytes: bytes, trace_id: str) -> OCRResult | None:
+        """Returns recognition result, or None if the pool is saturated, the job timed out or recognition failed."""
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.job_timeout_sec)
+        except TimeoutError:
+            self.logger.warning("%s OCR queue is full, skipping recognition", trace_id)
+            return None
+        executor = self._executor
+        try:
+            future: Future[OCRResult] = executor.submit(_recognize, image_bytes)
+        except (BrokenProcessPool, RuntimeError) as e:
+            self._slots.release()
+            self.logger.error("%s OCR pool is unavailable, restarting it: %s", trace_id, e)
+            self._restart_executor(executor)
+            return None
+        # The slot is held until the worker is actually free, not until the caller stops waiting
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._on_job_done, executor, future))
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.job_timeout_sec)
+        except TimeoutError:
+            self.logger.warning("%s OCR job timed out after %ss", trace_id, self.job_timeout_sec)
+        except OCRWorkerError as e:
+            self.logger.error("%s Failed to recognize image; continuing spam analysis without OCR: %s", trace_id, e)
+        except BrokenProcessPool as e:
+            self.logger.error("%s OCR worker crashed, restarting pool: %s", trace_id, e)
+        return None
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        # Workers are spawned rather than forked, because the bot process runs background threads
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.engine_type, self.tesseract_cmd, self.lang, self.job_timeout_sec, self.preprocessor,
+                      self.qr_decoding, self.job_timeout_sec * self.__JOB_DEADLINE_FACTOR),
+        )
+
+    def _on_job_done(self, executor: ProcessPoolExecutor, future: Future[OCRResult]) -> None:
+        self._slots.release()
+        # Also restarts the pool when the caller of a job stuck past the deadline has already timed out
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            self._restart_executor(executor)
+
+    def _restart_executor(self, broken_executor: ProcessPoolExecutor) -> None:
+        # Concurrent jobs of a crashed pool all fail at once, only the first of them restarts it
+        if self._executor is not broken_executor:
+            return
+        self._executor = self._create_executor()
+        broken_executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,17 @@
+import pytesseract
+from PIL import Image
+
+from src.handlers.spam_filters.ocr.OCREngine import OCREngine
+
+
+class PytesseractEngine(OCREngine):
+    """Runs a new tesseract process for every image, the language model is loaded every time."""
+
+    def __init__(self, tesseract_cmd: str | None, lang: str, timeout_sec: float):
+        if tesseract_cmd:
+            pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+        self.lang = lang
+        self.timeout_sec = timeout_sec
+
+    def recognize(self, image: Image.Image) -> str:
+        return pytesseract.image_to_string(image, lang=self.lang, timeout=self.timeout_sec)
@@ -0,0 +1,27 @@
+from PIL import Image
+
+
+class QRCodeDecoder:
+    """
+    Decodes QR codes and barcodes with the optional pyzbar package, which requires the zbar library.
+    """
+
+    def __init__(self):
+        from pyzbar import pyzbar
+        self.__decode = pyzbar.decode
+
+    @staticmethod
+    def is_available() -> bool:
+        try:
+            from pyzbar import pyzbar  # noqa: F401
+        except (ImportError, OSError):
+            return False
+        return True
+
+    def decode(self, image: Image.Image) -> list[str]:
+        payloads = []
+        for symbol in self.__decode(image.convert("L")):
+            payload = symbol.data.decode("utf-8", errors="replace").strip()
+            if payload and payload not in payloads:
+                payloads.append(payload)
+        return payloads
@@ -0,0 +1,65 @@
+import os
+import urllib.parse
+
+from src.util.LoggerUtil import LoggerUtil
+
+
+class QRDenyIndex:
+    """
+    Local list of known spam destinations matched against decoded QR code payloads.
+    Every line of the list file is a domain, a Telegram @username or any other exact payload such as a wallet address;
+    empty lines and lines starting with `#` are ignored.
+    A domain also matches its subdomains and any URL on it, a username also matches its t.me links.
+    """
+    __TELEGRAM_LINK_HOSTS = frozenset({"t.me", "telegram.me", "telegram.dog"})
+
+    def __init__(self, entries: set[str] | None = None):
+        self.entries = entries if entries is not None else set()
+
+    @classmethod
+    def load(cls, file_path: str) -> 'QRDenyIndex':
+        """Loads the deny list, a missing file is an empty list."""
+        logger = LoggerUtil.get_logger("QRDenyIndex", "OCR")
+        if not os.path.exists(file_path):
+            logger.info(f"QR deny list {file_path} does not exist, decoded QR codes are only passed to the classifier")
+            return cls()
+        entries = set()
+        with open(file_path, encoding="utf-8") as f:
+            for line in f:
+                entry = cls.__normalize(line)
+                if entry and not entry.startswith("#"):
+                    entries.add(entry)
+        logger.info(f"Loaded QR deny list with {len(entries)} entries from {file_path}")
+        return cls(entries)
+
+    def match(self, payload: str) -> str | None:
+        """Returns the deny list entry matching the payload, or None."""
+        if not self.entries:
+            return None
+        for candidate in self.__get_candidates(self.__normalize(payload)):
+            if candidate in self.entries:
+                return candidate
+        return None
+
+    @classmethod
+    def __get_candidates(cls, payload: str) -> list[str]:
+        candidates = [payload]
+        url = payload if "://" in payload else f"https://{payload}"
+        try:
+            split_url = urllib.parse.urlsplit(url)
+        except ValueError:
+            return candidates
+        host = split_url.hostname
+        if not host or "." not in host:
+            return candidates
+        labels = host.removeprefix("www.").split(".")
+        candidates.extend(".".join(labels[i:]) for i in range(len(labels) - 1))
+        if host in cls.__TELEGRAM_LINK_HOSTS:
+            username = split_url.path.strip("/").split("/", 1)[0]
+            if username:
+                candidates.append(f"@{username}")
+        return candidates
+
+    @staticmethod
+    def __normalize(value: str) -> str:
+        return value.strip().lower()
@@ -0,0 +1,287 @@
+import asyncio
+import hashlib
+import logging
+import random
+import re
+import time
+import traceback
+import urllib.parse
+from json import JSONDecodeError
+
+import httpx
+from telegram import File
+from telegram.error import BadRequest, NetworkError, RetryAfter
+from telegram.ext import CallbackContext
+
+from src.util.LoggerUtil import LoggerUtil
+from src.util.cache.LRUCache import LRUCache
+
+
+class FileTooLargeError(Exception):
+    pass
+
+
+class TelegramFileDownloader:
+    """
+    Downloads Telegram files into memory for OCR.
+    The file is streamed over a dedicated HTTP connection pool into a buffer preallocated from the known file size,
+    and the download is aborted as soon as it exceeds `max_bytes`.
+    Resolved files are cached by file_unique_id, so reposts of the same file do not repeat the getFile request,
+    and failed attempts are retried with exponential backoff and full jitter.
+    """
+    # Telegram keeps download links valid for at least an hour
+    __FILE_CACHE_TTL_SECONDS = 50 * 60
+    __FILE_CACHE_MAX_ENTRIES = 1000
+    __RETRY_BASE_DELAY_SECONDS = 0.5
+    __RETRY_MAX_DELAY_SECONDS = 8
+    __INITIAL_BUFFER_SIZE = 256 * 1024
+    __DIAGNOSTIC_PAYLOAD_PREVIEW_BYTES = 4096
+    __TIMEOUT_SEC = 20
+    __CONNECT_TIMEOUT_SEC = 5
+    __MAX_CONNECTIONS = 16
+
+    def __init__(self, max_bytes: int, attempts: int, diagnostics_enabled: bool = False):
+        """
+        :param max_bytes: Files larger than this are not downloaded.
+        :param attempts: Number of download attempts, including the first one.
+        :param diagnostics_enabled: Repeat failed requests at the transport level and log the raw response.
+        """
+        self.max_bytes = max_bytes
+        self.attempts = attempts
+        self.diagnostics_enabled = diagnostics_enabled
+        self.logger = LoggerUtil.get_logger("TelegramFileDownloader", "OCR")
+        self.files: LRUCache[str, File] = LRUCache(self.__FILE_CACHE_MAX_ENTRIES, self.__FILE_CACHE_TTL_SECONDS)
+        self.__http_client: httpx.AsyncClient | None = None
+
+    async def download(
+            self,
+            context: CallbackContext,
+            file_id: str,
+            file_unique_id: str,
+            file_size: int | None,
+            trace_id: str,
+            max_bytes: int | None = None,
+    ) -> bytearray | None:
+        """
+        Returns file content, or None if the file is too large or could not be downloaded.
+        :param max_bytes: Size limit for this file, overrides the downloader default.
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        if file_size is not None and file_size > max_bytes:
+            self.logger.info("%s Skipping file %s of %s bytes, the limit is %s bytes",
+                             trace_id, file_unique_id, file_size, max_bytes)
+            return None
+        token = context.bot.token
+        for attempt in range(1, self.attempts + 1):
+            phase = "get_file"
+            telegram_file: File | None = None
+            started_at = time.monotonic()
+            try:
+                telegram_file = await self.__get_file(context, file_id, file_unique_id)
+                phase = "download"
+                file_bytes = await self.__download_file(telegram_file, file_size or telegram_file.file_size, max_bytes)
+                self.logger.debug("%s Downloaded file %s on attempt %s/%s: bytes=%s elapsed_ms=%s",
+                                  trace_id, file_unique_id, attempt, self.attempts, len(file_bytes),
+                                  round((time.monotonic() - started_at) * 1000))
+                return file_bytes
+            except FileTooLargeError as error:
+                self.logger.info("%s Skipping file %s: %s", trace_id, file_unique_id, error)
+                return None
+            except BadRequest as error:
+                self.logger.error("%s Telegram rejected file %s; continuing spam analysis without OCR: %s",
+                                  trace_id, file_unique_id, self.__sanitize(repr(error), token))
+                return None
+            except (NetworkError, RetryAfter, httpx.HTTPError, JSONDecodeError) as error:
+                # A stale download link is resolved again on the next attempt
+                self.files.pop(file_unique_id)
+                self.logger.warning(
+                    "%s File %s download attempt %s/%s failed: phase=%s elapsed_ms=%s error=%s",
+                    trace_id,
+                    file_unique_id,
+                    attempt,
+                    self.attempts,
+                    phase,
+                    round((time.monotonic() - started_at) * 1000),
+                    self.__sanitize(repr(error), token),
+                )
+                if self.diagnostics_enabled:
+                    self.logger.debug("%s Sanitized traceback:\n%s", trace_id, self.__format_exception(error, token))
+                    await self.__log_raw_response(context, file_id, telegram_file, phase, attempt, trace_id)
+                if attempt == self.attempts:
+                    self.logger.error("%s Failed to download file %s after %s attempts; "
+                                      "continuing spam analysis without OCR", trace_id, file_unique_id, self.attempts)
+                    return None
+                await asyncio.sleep(self.__get_retry_delay(attempt, error))
+            except Exception as error:
+                # Unexpected errors are not retried, but must not abort the spam analysis of the message
+                self.logger.error("%s Failed to download file %s: phase=%s error=%s; "
+                                  "continuing spam analysis without OCR",
+                                  trace_id, file_unique_id, phase, self.__sanitize(repr(error), token))
+                if self.diagnostics_enabled:
+                    self.logger.debug("%s Sanitized traceback:\n%s", trace_id, self.__format_exception(error, token))
+                return None
+        return None
+
+    def get_stats(self) -> str:
+        return f"resolved files: {self.files.get_stats()}"
+
+    async def close(self) -> None:
+        http_client = self.__http_client
+        if http_client is None:
+            return
+        self.__http_client = None
+        await http_client.aclose()
+
+    def __get_http_client(self) -> httpx.AsyncClient:
+        # python-telegram-bot only downloads whole files, so files are streamed with a client of its own
+        if self.__http_client is None:
+            self.__http_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.__TIMEOUT_SEC, connect=self.__CONNECT_TIMEOUT_SEC),
+                limits=httpx.Limits(max_connections=self.__MAX_CONNECTIONS),
+            )
+        return self.__http_client
+
+    async def __get_file(self, context: CallbackContext, file_id: str, file_unique_id: str) -> File:
+        telegram_file = self.files.get(file_unique_id)
+        if telegram_file is None:
+            telegram_file = await context.bot.get_file(file_id=file_id)
+            self.files.put(file_unique_id, telegram_file)
+        return telegram_file
+
+    async def __download_file(self, telegram_file: File, file_size: int | None, max_bytes: int) -> bytearray:
+        if file_size is not None and file_size > max_bytes:
+            raise FileTooLargeError(f"file of {file_size} bytes exceeds the limit of {max_bytes} bytes")
+        url = self.__encoded_url(telegram_file.file_path)
+        # Local Bot API servers return file paths instead of links
+        if not url.startswith(("http://", "https://")):
+            file_bytes = await telegram_file.download_as_bytearray()
+            if len(file_bytes) > max_bytes:
+                raise FileTooLargeError(f"file of {len(file_bytes)} bytes exceeds the limit of {max_bytes} bytes")
+            return file_bytes
+        async with self.__get_http_client().stream("GET", url) as response:
+            response.raise_for_status()
+            content_length = response.headers.get("Content-Length")
+            if file_size is None and content_length is not None and content_length.isdigit():
+                file_size = int(content_length)
+            if file_size is not None and file_size > max_bytes:
+                raise FileTooLargeError(f"file of {file_size} bytes exceeds the limit of {max_bytes} bytes")
+            buffer = bytearray(file_size or self.__INITIAL_BUFFER_SIZE)
+            received = 0
+            async for chunk in response.aiter_bytes():
+                end = received + len(chunk)
+                if end > max_bytes:
+                    raise FileTooLargeError(f"file exceeds the limit of {max_bytes} bytes")
+                # Overwrites the preallocated space in place and grows the buffer only past its end
+                buffer[received:end] = chunk
+                received = end
+        del buffer[received:]
+        return buffer
+
+    def __get_retry_delay(self, attempt: int, error: Exception) -> float:
+        delay = random.uniform(0, min(self.__RETRY_MAX_DELAY_SECONDS, self.__RETRY_BASE_DELAY_SECONDS * 2 ** attempt))
+        if isinstance(error, RetryAfter):
+            retry_after = error.retry_after
+            return max(delay, retry_after if isinstance(retry_after, (int, float)) else retry_after.total_seconds())
+        return delay
+
+    async def __log_raw_response(
+            self,
+            context: CallbackContext,
+            file_id: str,
+            telegram_file: File | None,
+            phase: str,
+            attempt: int,
+            trace_id: str,
+    ) -> None:
+        """Repeat a failed request at the transport level to expose HTTP status and body."""
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
+
+        bot = context.bot
+        token = bot.token
+        request = bot.request
+        if phase == "download" and telegram_file is not None:
+            url = self.__encoded_url(telegram_file.file_path)
+            if not url.startswith(("http://", "https://")):
+                self.logger.debug("%s Raw diagnostic probe skipped on attempt %s/%s: file path is local path=%s",
+                                  trace_id, attempt, self.attempts, self.__sanitize(url, token))
+                return
+            request = telegram_file.get_bot().request
+        else:
+            query = urllib.parse.urlencode({"file_id": file_id})
+            url = f"{bot.base_url}/getFile?{query}"
+
+        self.logger.debug(
+            "%s Raw diagnostic probe on attempt %s/%s: original_phase=%s method=GET url=%s request_type=%s",
+            trace_id,
+            attempt,
+            self.attempts,
+            phase,
+            self.__sanitize(url, token, redact_file_id=True),
+            type(request).__name__,
+        )
+        try:
+            status_code, payload = await request.do_request(url=url, method="GET")
+            payload_preview = payload[:self.__DIAGNOSTIC_PAYLOAD_PREVIEW_BYTES].decode("utf-8", errors="replace")
+            self.logger.debug(
+                "%s Raw diagnostic response on attempt %s/%s: original_phase=%s "
+                "status=%s payload_bytes=%s payload_truncated=%s payload=%r",
+                trace_id,
+                attempt,
+                self.attempts,
+                phase,
+                status_code,
+                len(payload),
+                len(payload) > self.__DIAGNOSTIC_PAYLOAD_PREVIEW_BYTES,
+                self.__sanitize(payload_preview, token),
+            )
+        except Exception as probe_error:
+            self.logger.debug(
+                "%s Raw diagnostic probe failed on attempt %s/%s: error_type=%s error_repr=%s traceback=\n%s",
+                trace_id,
+                attempt,
+                self.attempts,
+                type(probe_error).__name__,
+                self.__sanitize(repr(probe_error), token),
+                self.__format_exception(probe_error, token),
+            )
+
+    @staticmethod
+    def describe_identifier(value: str) -> str:
+        digest = hashlib.sha256(value.encode("utf-8")).hexdigest()[:12]
+        return f"sha256:{digest}/length:{len(value)}"
+
+    @staticmethod
+    def __encoded_url(file_path: str | None) -> str:
+        if not file_path:
+            return "<missing>"
+        split_url = urllib.parse.urlsplit(str(file_path))
+        return urllib.parse.urlunsplit(
+            urllib.parse.SplitResult(
+                split_url.scheme,
+                split_url.netloc,
+                urllib.parse.quote(split_url.path),
+                split_url.query,
+                split_url.fragment,
+            )
+        )
+
+    @classmethod
+    def __format_exception(cls, error: Exception, token: str) -> str:
+        formatted = "".join(traceback.format_exception(type(error), error, error.__traceback__))
+        return cls.__sanitize(formatted, token)
+
+    @staticmethod
+    def __sanitize(value: str, token: str, redact_file_id: bool = False) -> str:
+        sanitized = str(value)
+        for token_variant in (token, urllib.parse.quote(token, safe="")):
+            if token_variant:
+                sanitized = sanitized.replace(token_variant, "<BOT_TOKEN>")
+        sanitized = re.sub(
+            r"(?i)(?:bot)?\d{6,}:[A-Za-z0-9_-]{20,}",
+            "<BOT_TOKEN>",
+            sanitized,
+        )
+        if redact_file_id:
+            sanitized = re.sub(r"([?&]file_id=)[^&#]+", r"\1<FILE_ID>", sanitized)
+        return sanitized
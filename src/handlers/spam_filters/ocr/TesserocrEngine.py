@@ -0,0 +1,24 @@
+import tesserocr
+from PIL import Image
+
+from src.handlers.spam_filters.ocr.OCREngine import OCREngine
+
+
+class TesserocrEngine(OCREngine):
+    """
+    Keeps one Tesseract API instance with the language model loaded for the lifetime of the worker process,
+    so only recognition itself is paid per image.
+    """
+
+    def __init__(self, lang: str, timeout_sec: float):
+        self.timeout_ms = int(timeout_sec * 1000)
+        self.api = tesserocr.PyTessBaseAPI(lang=lang)
+
+    def recognize(self, image: Image.Image) -> str:
+        try:
+            self.api.SetImage(image)
+            if not self.api.Recognize(timeout=self.timeout_ms):
+                raise RuntimeError(f"Tesseract recognition did not finish within {self.timeout_ms} ms")
+            return self.api.GetUTF8Text()
+        finally:
+            self.api.Clear()
@@ -0,0 +1,116 @@
+import asyncio
+from dataclasses import dataclass
+
+from telegram.ext import CallbackContext
+
+from src.handlers.spam_filters.openai.OpenAIModels import OpenAIMessageInput, SpamClassification
+from src.handlers.spam_filters.openai.OpenAIWatchdog import OpenAIWatchdog
+from src.util.LoggerUtil import LoggerUtil
+from src.util.cache.SingleFlight import SingleFlight
+
+
+@dataclass
+class PendingClassification:
+    message_input: OpenAIMessageInput
+    result: asyncio.Future
+
+
+class ClassificationScheduler:
+    """
+    Schedules classification requests to OpenAI.
+    Identical inputs classified at the same time share one request. With a batch size above 1, distinct messages
+    arriving within the batch wait time are classified together with one request returning an array of verdicts,
+    so a burst of messages costs a few requests instead of one request per message.
+    """
+    __STATS_LOG_INTERVAL = 100
+
+    def __init__(self, watchdog: OpenAIWatchdog, max_batch_size: int, max_batch_wait_ms: int):
+        """
+        :param watchdog: Client sending requests and tracking OpenAI availability.
+        :param max_batch_size: Maximal number of messages in one request, 1 disables batching.
+        :param max_batch_wait_ms: Maximal time the first message of a batch waits for other messages.
+        """
+        self.watchdog = watchdog
+        self.max_batch_size = max_batch_size
+        self.max_batch_wait_sec = max_batch_wait_ms / 1000
+        self.logger = LoggerUtil.get_logger("ClassificationScheduler", "OpenAI")
+        self._requests: SingleFlight[str, SpamClassification | None] = SingleFlight()
+        self._batch: list[PendingClassification] = []
+        self._batch_context: CallbackContext | None = None
+        self._batch_timer: asyncio.TimerHandle | None = None
+        self._batch_tasks: set[asyncio.Task] = set()
+        self._classifications = 0
+        self._batches = 0
+        self._batched_messages = 0
+
+    async def classify(
+            self,
+            context: CallbackContext,
+            message_input: OpenAIMessageInput,
+    ) -> SpamClassification | None:
+        self._classifications += 1
+        if self._classifications % self.__STATS_LOG_INTERVAL == 0:
+            self.logger.info(f"Classification requests: {self.get_stats()}")
+        return await self._requests.run(
+            message_input.model_dump_json(),
+            lambda: self.__schedule(context, message_input),
+        )
+
+    def get_stats(self) -> str:
+        return (f"{self._requests.get_stats()} batches={self._batches} "
+                f"batched_messages={self._batched_messages}")
+
+    async def __schedule(
+            self,
+            context: CallbackContext,
+            message_input: OpenAIMessageInput,
+    ) -> SpamClassification | None:
+        if self.max_batch_size <= 1:
+            return await self.watchdog.classify_message(context, message_input)
+        loop = asyncio.get_running_loop()
+        pending = PendingClassification(message_input, loop.create_future())
+        self._batch.append(pending)
+        if len(self._batch) == 1:
+            self._batch_context = context
+            self._batch_timer = loop.call_later(self.max_batch_wait_sec, self.__flush)
+        if len(self._batch) >= self.max_batch_size:
+            self.__flush()
+        return await pending.result
+
+    def __flush(self) -> None:
+        if self._batch_timer is not None:
+            self._batch_timer.cancel()
+            self._batch_timer = None
+        batch, context = self._batch, self._batch_context
+        self._batch, self._batch_context = [], None
+        if not batch:
+            return
+        # The event loop keeps only weak references to tasks
+        task = asyncio.ensure_future(self.__classify_batch(context, batch))
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+
+    async def __classify_batch(self, context: CallbackContext, batch: list[PendingClassification]) -> None:
+        try:
+            if len(batch) == 1:
+                classifications = [await self.watchdog.classify_message(context, batch[0].message_input)]
+            else:
+                self._batches += 1
+                self._batched_messages += len(batch)
+                self.logger.info(f"Classifying {len(batch)} messages with one request")
+                classifications = await self.watchdog.classify_messages(
+                    context,
+                    [pending.message_input for pending in batch],
+                ) or [None] * len(batch)
+        except asyncio.CancelledError:
+            for pending in batch:
+                pending.result.cancel()
+            raise
+        except Exception as error:
+            for pending in batch:
+                if not pending.result.done():
+                    pending.result.set_exception(error)
+            return
+        for pending, classification in zip(batch, classifications):
+            if not pending.result.done():
+                pending.result.set_result(classification)
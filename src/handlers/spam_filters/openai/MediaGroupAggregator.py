@@ -0,0 +1,95 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+
+from src.handlers.spam_filters.openai.OpenAIModels import OpenAIMessageInput, SpamClassification
+from src.util.LoggerUtil import LoggerUtil
+
+MediaGroupKey = tuple[int, str]
+
+
+@dataclass
+class MediaGroup:
+    leader_message_id: int
+    inputs: list[OpenAIMessageInput] = field(default_factory=list)
+    is_collecting: bool = True
+    result: asyncio.Future = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+
+
+class MediaGroupAggregator:
+    """
+    Classifies messages of one album (media group) with a single request.
+    The first message of a group becomes its leader: it waits for the rest of the album during the collection window,
+    then classifies the combined input. Other messages arriving during the window wait for the leader's result.
+    A message arriving after the window reuses the group result only if it is spam, otherwise it is classified
+    on its own, so a late spam photo of an album with a benign first photo is not let through.
+    """
+
+    def __init__(self, window_sec: float, result_ttl_sec: float):
+        self.window_sec = window_sec
+        self.result_ttl_sec = result_ttl_sec
+        self.logger = LoggerUtil.get_logger("MediaGroupAggregator", "OpenAI")
+        self._groups: dict[MediaGroupKey, MediaGroup] = {}
+
+    async def classify(
+            self,
+            key: MediaGroupKey,
+            message_id: int,
+            message_input: OpenAIMessageInput,
+            classify: Callable[[OpenAIMessageInput], Awaitable[SpamClassification | None]],
+    ) -> tuple[SpamClassification | None, bool]:
+        """
+        Returns group classification and whether the message is the group leader.
+        Only the leader should apply moderation actions that must happen once per album.
+        """
+        group = self._groups.get(key)
+        if group is not None:
+            if group.is_collecting:
+                group.inputs.append(message_input)
+                return await asyncio.shield(group.result), False
+            group_result = await self.__get_group_result(group)
+            if group_result is not None and group_result.verdict == "spam":
+                return group_result, False
+            self.logger.info(f"Message {message_id} arrived after media group {key} was classified, "
+                             f"classifying it separately")
+            # The message is moderated on its own, as the group leader was not
+            return await classify(message_input), True
+
+        group = MediaGroup(leader_message_id=message_id, inputs=[message_input])
+        self._groups[key] = group
+        try:
+            await asyncio.sleep(self.window_sec)
+            group.is_collecting = False
+            self.logger.info(f"Classifying media group {key} of {len(group.inputs)} message(s)")
+            result = await classify(self.__combine_inputs(group.inputs))
+        except asyncio.CancelledError:
+            self._groups.pop(key, None)
+            group.result.cancel()
+            raise
+        except Exception as error:
+            self._groups.pop(key, None)
+            group.result.set_exception(error)
+            # Followers receive the error, the leader re-raises it
+            group.result.exception()
+            raise
+        group.result.set_result(result)
+        asyncio.get_running_loop().call_later(self.result_ttl_sec, self._groups.pop, key, None)
+        return result, True
+
+    @staticmethod
+    async def __get_group_result(group: MediaGroup) -> SpamClassification | None:
+        """Waits for the group classification, a failed or cancelled classification has no result."""
+        await asyncio.wait([group.result])
+        if group.result.cancelled() or group.result.exception() is not None:
+            return None
+        return group.result.result()
+
+    @staticmethod
+    def __combine_inputs(inputs: list[OpenAIMessageInput]) -> OpenAIMessageInput:
+        return OpenAIMessageInput(
+            target_message="\n\n".join(item.target_message for item in inputs if item.target_message.strip()),
+            attachment_transcript="\n\n".join(
+                item.attachment_transcript for item in inputs if item.attachment_transcript.strip()
+            ),
+            replied_to_message=next((item.replied_to_message for item in inputs if item.replied_to_message), ""),
+        )
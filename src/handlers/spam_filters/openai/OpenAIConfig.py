@@ -111,6 +111,17 @@ class OpenAIFilterConfig(BaseModel):
     text_verbosity: Literal["low", "medium", "high"] = "low"
     ban_delay_sec: int = 60 * 10
     ban_notification_message_delete_delay_sec: int = 30
+    media_group_window_ms: int = 1500
+    verdict_cache_max_entries: int = 10_000
+    verdict_cache_ttl_sec: int = 60 * 60
+    near_duplicate_max_distance: int = 8
+    near_duplicate_min_text_length: int = 24
+    classification_batch_size: int = 1
+    classification_batch_wait_ms: int = 200
+    max_concurrent_requests: int = 8
+    requests_per_minute: int = 0
+    tokens_per_minute: int = 0
+    max_queue_wait_ms: int = 10_000
 
     @model_validator(mode="before")
     @classmethod
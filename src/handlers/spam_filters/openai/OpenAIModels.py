@@ -14,6 +14,22 @@ class SpamClassification(BaseModel):
     reason: str
 
 
+class IndexedOpenAIMessageInput(OpenAIMessageInput):
+    index: int
+
+
+class OpenAIBatchInput(BaseModel):
+    messages: list[IndexedOpenAIMessageInput]
+
+
+class IndexedSpamClassification(SpamClassification):
+    index: int
+
+
+class SpamClassificationBatch(BaseModel):
+    classifications: list[IndexedSpamClassification]
+
+
 SPAM_CLASSIFICATION_SCHEMA = {
     "type": "object",
     "properties": {
@@ -26,3 +42,31 @@ SPAM_CLASSIFICATION_SCHEMA = {
     "required": ["verdict", "reason"],
     "additionalProperties": False,
 }
+
+SPAM_CLASSIFICATION_BATCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "classifications": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "index": {"type": "integer"},
+                    **SPAM_CLASSIFICATION_SCHEMA["properties"],
+                },
+                "required": ["index", "verdict", "reason"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["classifications"],
+    "additionalProperties": False,
+}
+
+BATCH_INSTRUCTIONS = """
+
+# Batch input
+
+The input contains several independent messages in `messages`, each with an `index`.
+Classify every message separately by the rules above, as if it were the only message.
+Return one item in `classifications` per input message, with the same `index`."""
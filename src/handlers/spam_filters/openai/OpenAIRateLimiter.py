@@ -0,0 +1,172 @@
+import asyncio
+import re
+import time
+from collections.abc import Mapping
+
+from src.util.LoggerUtil import LoggerUtil
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously up to a per-minute capacity, 0 capacity means unlimited.
+    The capacity and the current amount are corrected from rate limit headers reported by the API.
+    """
+
+    def __init__(self, capacity_per_minute: int):
+        self.capacity = capacity_per_minute
+        self.tokens = float(capacity_per_minute)
+        self._updated_at = time.monotonic()
+
+    def get_wait_seconds(self, amount: float) -> float:
+        """Returns how long to wait until the amount is available, 0 if it is available now."""
+        if self.capacity <= 0:
+            return 0.0
+        self.__refill()
+        # Requests larger than the bucket are admitted once it is full
+        missing = min(amount, self.capacity) - self.tokens
+        return max(0.0, missing * 60 / self.capacity)
+
+    def consume(self, amount: float) -> None:
+        if self.capacity <= 0:
+            return
+        self.__refill()
+        self.tokens -= amount
+
+    def observe(self, limit: int | None, remaining: int | None) -> None:
+        """Adapts the bucket to the limit and remaining amount reported by the API."""
+        if limit is not None and limit > 0 and (self.capacity <= 0 or limit < self.capacity):
+            was_unlimited = self.capacity <= 0
+            self.__refill()
+            self.capacity = limit
+            self.tokens = float(limit) if was_unlimited else min(self.tokens, float(limit))
+        if remaining is not None and self.capacity > 0:
+            self.__refill()
+            self.tokens = min(self.tokens, float(remaining))
+
+    def __refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(float(self.capacity), self.tokens + (now - self._updated_at) * self.capacity / 60)
+        self._updated_at = now
+
+
+class OpenAIRateLimiter:
+    """
+    Limits OpenAI requests by the number of concurrent requests and by requests and tokens per minute.
+    Requests wait in a queue for their turn; a request that would wait longer than `max_queue_wait_sec`
+    is rejected immediately, so a burst of messages cannot pile up behind the rate limits.
+    """
+    __DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+    __DEFAULT_BLOCK_SECONDS = 1.0
+
+    def __init__(self, max_concurrent_requests: int, requests_per_minute: int, tokens_per_minute: int,
+                 max_queue_wait_sec: float):
+        """
+        :param max_concurrent_requests: Maximal number of requests in flight.
+        :param requests_per_minute: Request rate limit, 0 uses only the limit reported by the API.
+        :param tokens_per_minute: Token rate limit, 0 uses only the limit reported by the API.
+        :param max_queue_wait_sec: Maximal time a request may wait for its turn.
+        """
+        self.max_queue_wait_sec = max_queue_wait_sec
+        self.logger = LoggerUtil.get_logger("OpenAIRateLimiter", "OpenAI")
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._slots = asyncio.Semaphore(max_concurrent_requests)
+        self._blocked_until = 0.0
+        self.shed_requests = 0
+
+    async def acquire(self, estimated_tokens: int) -> bool:
+        """
+        Waits for a request slot and rate limit budget. Returns False if the request should be shed.
+        Every successful acquire must be followed by release().
+        """
+        deadline = time.monotonic() + self.max_queue_wait_sec
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.max_queue_wait_sec)
+        except TimeoutError:
+            return self.__shed("all request slots are busy")
+        try:
+            while True:
+                wait_seconds = max(
+                    self._blocked_until - time.monotonic(),
+                    self.requests.get_wait_seconds(1),
+                    self.tokens.get_wait_seconds(estimated_tokens),
+                )
+                if wait_seconds <= 0:
+                    break
+                if time.monotonic() + wait_seconds > deadline:
+                    self._slots.release()
+                    return self.__shed(f"rate limit budget is available only in {wait_seconds:.1f}s")
+                await asyncio.sleep(wait_seconds)
+        except BaseException:
+            # A request cancelled while waiting for the budget must not keep its slot
+            self._slots.release()
+            raise
+        self.requests.consume(1)
+        self.tokens.consume(estimated_tokens)
+        return True
+
+    def release(self, estimated_tokens: int, used_tokens: int | None = None) -> None:
+        """Frees the request slot and corrects the token budget by the actual usage."""
+        if used_tokens is not None:
+            self.tokens.consume(used_tokens - estimated_tokens)
+        self._slots.release()
+
+    def observe_headers(self, headers: Mapping[str, str]) -> None:
+        """Adapts limits to x-ratelimit-* headers of an OpenAI response."""
+        self.requests.observe(
+            self.__get_int(headers, "x-ratelimit-limit-requests"),
+            self.__get_int(headers, "x-ratelimit-remaining-requests"),
+        )
+        self.tokens.observe(
+            self.__get_int(headers, "x-ratelimit-limit-tokens"),
+            self.__get_int(headers, "x-ratelimit-remaining-tokens"),
+        )
+
+    def block_for(self, headers: Mapping[str, str]) -> None:
+        """Pauses all requests after a rate limit error until the reported limit reset."""
+        self.observe_headers(headers)
+        reset_seconds = self.__get_duration(headers, "retry-after-ms", scale=0.001) \
+            or self.__get_duration(headers, "retry-after")
+        if reset_seconds is None:
+            # Without an explicit retry delay, wait for the reset of every exhausted limit
+            reset_seconds = max(
+                (self.__get_duration(headers, f"x-ratelimit-reset-{limit}") or 0.0
+                 for limit in ("requests", "tokens")
+                 if headers.get(f"x-ratelimit-remaining-{limit}") == "0"),
+                default=self.__DEFAULT_BLOCK_SECONDS,
+            )
+        self._blocked_until = max(self._blocked_until, time.monotonic() + reset_seconds)
+        self.logger.warning(f"OpenAI rate limit reached, pausing requests for {reset_seconds:.1f}s")
+
+    def get_stats(self) -> str:
+        return (f"shed_requests={self.shed_requests} "
+                f"requests_per_minute={self.requests.capacity or 'unlimited'} "
+                f"tokens_per_minute={self.tokens.capacity or 'unlimited'}")
+
+    def __shed(self, reason: str) -> bool:
+        self.shed_requests += 1
+        self.logger.warning(f"Shedding OpenAI request, {reason}; {self.get_stats()}")
+        return False
+
+    @staticmethod
+    def __get_int(headers: Mapping[str, str], name: str) -> int | None:
+        value = headers.get(name)
+        if value is None or not value.isdigit():
+            return None
+        return int(value)
+
+    @classmethod
+    def __get_duration(cls, headers: Mapping[str, str], name: str, scale: float = 1.0) -> float | None:
+        """Parses durations like `20`, `1.5`, `20ms` or `6m0s`."""
+        value = headers.get(name)
+        if value is None:
+            return None
+        try:
+            return float(value) * scale
+        except ValueError:
+            pass
+        multipliers = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+        parts = cls.__DURATION_PART.findall(value)
+        if not parts:
+            return None
+        return sum(float(amount) * multipliers[unit] for amount, unit in parts)
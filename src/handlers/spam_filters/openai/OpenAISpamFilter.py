@@ -3,10 +3,15 @@ from telegram.ext import CallbackContext
 from telegram.helpers import escape_markdown
 
 from src.handlers.spam_filters.SpamFilter import SpamFilter
+from src.handlers.spam_filters.bayes.VerdictLog import VerdictLog
+from src.handlers.spam_filters.openai.ClassificationScheduler import ClassificationScheduler
+from src.handlers.spam_filters.openai.MediaGroupAggregator import MediaGroupAggregator
 from src.handlers.spam_filters.openai.OpenAIConfig import OpenAIFilterConfig
-from src.handlers.spam_filters.openai.OpenAIModels import OpenAIMessageInput
+from src.handlers.spam_filters.openai.OpenAIModels import OpenAIMessageInput, SpamClassification
 from src.handlers.spam_filters.openai.OpenAIWatchdog import OpenAIWatchdog
+from src.handlers.spam_filters.openai.VerdictCache import VerdictCache
 from src.telegram.EnrichedUpdate import EnrichedUpdate
+from src.telegram.LocalClassification import LocalVerdict
 from src.TelegramHelper import TelegramHelper
 from src.util.DevelopmentMode import get_development_delay_seconds, is_development_mode
 from src.util.data.BotState import BotState
@@ -15,29 +20,70 @@ from src.util.data.BotState import BotState
 class OpenAISpamFilter(SpamFilter):
     _filter_name = "OpenAI"
     _DEVELOPMENT_BAN_DELAY_SECONDS = 5
+    _MEDIA_GROUP_RESULT_TTL_SECONDS = 60
 
     def __init__(
             self,
             state: BotState,
             openai_config: OpenAIFilterConfig,
             openai_watchdog: OpenAIWatchdog,
+            verdict_log: VerdictLog | None = None,
     ):
+        """
+        :param verdict_log: Log of OpenAI verdicts used to train the local naive Bayes model, None disables logging.
+        """
         super().__init__(state)
         self.openai_config = openai_config
         self.openai_watchdog = openai_watchdog
+        self.verdict_log = verdict_log
         self._spam_reasons: dict[tuple[int, int], str] = {}
+        self._media_group_followers: set[tuple[int, int]] = set()
         self._ban_delay_seconds = self._get_ban_delay_seconds()
-
-    async def _is_spam(self, update: EnrichedUpdate, context: CallbackContext) -> bool:
-        """Checks if message is spam. Returns true if message is spam."""
-        classification = await self.openai_watchdog.classify_message(
-            context,
-            self._prepare_message_input(update),
+        self._media_group_aggregator = MediaGroupAggregator(
+            openai_config.media_group_window_ms / 1000,
+            self._MEDIA_GROUP_RESULT_TTL_SECONDS,
+        )
+        self._verdict_cache = VerdictCache(
+            openai_config.verdict_cache_max_entries,
+            openai_config.verdict_cache_ttl_sec,
+            openai_config.near_duplicate_max_distance,
+            openai_config.near_duplicate_min_text_length,
+        )
+        self._classification_scheduler = ClassificationScheduler(
+            openai_watchdog,
+            openai_config.classification_batch_size,
+            openai_config.classification_batch_wait_ms,
         )
-        if classification is None:
-            return False
 
+    async def _is_spam(self, update: EnrichedUpdate, context: CallbackContext) -> bool | None:
+        """
+        Checks if message is spam. Returns true if message is spam.
+        Returns None if OpenAI gave no verdict, e.g. the request failed or was shed by the rate limiter.
+        """
         message = update.message
+        local_classification = update.local_classification
+        if local_classification is not None and local_classification.verdict == LocalVerdict.NOT_SPAM:
+            # Confidently not spam according to the local model, OpenAI is not asked
+            return False
+        message_input = self._prepare_message_input(update)
+        is_media_group_leader = True
+        if message.media_group_id is None:
+            classification = await self._classify(context, message_input)
+        else:
+            classification, is_media_group_leader = await self._media_group_aggregator.classify(
+                (message.chat_id, message.media_group_id),
+                message.id,
+                message_input,
+                lambda combined_input: self._classify(context, combined_input),
+            )
+        if classification is None:
+            self.logger.info(
+                "No OpenAI verdict for message %s, OpenAI circuit is %s",
+                message.id,
+                self.openai_watchdog.get_circuit_state(),
+            )
+            return None
+
         self.logger.info(
             "OpenAI verdict for message %s: %s (%s)",
             message.id,
@@ -47,11 +93,38 @@ class OpenAISpamFilter(SpamFilter):
         if classification.verdict != "spam":
             return False
 
-        self._spam_reasons[(message.chat_id, message.id)] = classification.reason
+        if is_media_group_leader:
+            self._spam_reasons[(message.chat_id, message.id)] = classification.reason
+        else:
+            self._media_group_followers.add((message.chat_id, message.id))
         return True
 
+    async def _classify(
+            self,
+            context: CallbackContext,
+            message_input: OpenAIMessageInput,
+    ) -> SpamClassification | None:
+        classification = self._verdict_cache.get(message_input)
+        if classification is not None:
+            return classification
+        classification = await self._classification_scheduler.classify(context, message_input)
+        if classification is not None:
+            self._verdict_cache.put(message_input, classification)
+            if self.verdict_log is not None:
+                self.verdict_log.append(
+                    VerdictLog.get_text(message_input.target_message, message_input.attachment_transcript),
+                    classification.verdict,
+                )
+        return classification
+
     async def _on_spam(self, update: EnrichedUpdate, context: CallbackContext) -> None:
         """Handles the action to take when a message is identified as spam."""
+        message_key = (update.message.chat_id, update.message.id)
+        if message_key in self._media_group_followers:
+            # The author is restricted and notified once per album by the group leader
+            self._media_group_followers.discard(message_key)
+            await self.telegram_helper.try_remove_message(context, update.message)
+            return
         user = self.telegram_helper.extract_message_user(update.message)
         chat_id = update.message.chat_id
         await self.telegram_helper.try_remove_message(context, update.message)
@@ -7,16 +7,23 @@ from enum import StrEnum
 from typing import TypeVar
 
 import httpx
-from openai import AsyncOpenAI
+from openai import AsyncOpenAI, RateLimitError
 from telegram.ext import Application, CallbackContext, Job
 
 from src.handlers.ServiceNotificationsHandler import ServiceNotificationsHandler
 from src.handlers.spam_filters.openai.OpenAIConfig import OpenAIFilterConfig
 from src.handlers.spam_filters.openai.OpenAIModels import (
+    BATCH_INSTRUCTIONS,
+    IndexedOpenAIMessageInput,
+    OpenAIBatchInput,
     OpenAIMessageInput,
+    SPAM_CLASSIFICATION_BATCH_SCHEMA,
     SPAM_CLASSIFICATION_SCHEMA,
     SpamClassification,
+    SpamClassificationBatch,
 )
+from src.handlers.spam_filters.openai.OpenAIRateLimiter import OpenAIRateLimiter
+from src.util.EnvUtil import get_int_env
 from src.util.LoggerUtil import LoggerUtil
 
 
@@ -28,6 +35,12 @@ class OpenAIIncidentStatus(StrEnum):
     RESOLVED = "resolved"
 
 
+class OpenAICircuitState(StrEnum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
 @dataclass
 class OpenAIIncident:
     error: str
@@ -42,9 +55,20 @@ class OpenAIUnavailableError(Exception):
 
 
 class OpenAIWatchdog:
+    """
+    Sends requests to OpenAI and tracks its availability as incidents.
+    An active incident opens the circuit: classification requests are skipped and return no verdict immediately,
+    while the availability check probes OpenAI at a faster interval. The circuit is half-open while a probe is
+    in flight and closes when a request succeeds again.
+    """
     _DEFAULT_CHECK_INTERVAL_SECONDS = int(timedelta(hours=1).total_seconds())
+    _DEFAULT_PROBE_INTERVAL_SECONDS = 30
     _REQUEST_TIMEOUT_SECONDS = 30
     _MAX_ERROR_TEXT_LENGTH = 3000
+    # Rough token estimate for rate limiting, corrected by the actual usage once the response arrives
+    _CHARACTERS_PER_TOKEN = 3
+    _ESTIMATED_OUTPUT_TOKENS = 256
+    _AVAILABILITY_CHECK_TOKENS = 32
 
     def __init__(self, config: OpenAIFilterConfig, notifications_handler: ServiceNotificationsHandler):
         self.config = config
@@ -53,14 +77,30 @@ class OpenAIWatchdog:
         self.incidents: list[OpenAIIncident] = []
         self._incident_lock = asyncio.Lock()
         self._job: Job | None = None
+        self._probe_job: Job | None = None
+        self._application: Application | None = None
+        self._probe_in_flight = False
+        self._skipped_requests = 0
         self._client = self._create_client()
         self._check_interval_seconds = self._get_check_interval_seconds()
+        self._probe_interval_seconds = get_int_env(
+            "OPENAI_WATCHDOG_PROBE_INTERVAL_SECONDS",
+            self._DEFAULT_PROBE_INTERVAL_SECONDS,
+            min_value=1,
+        )
+        self._rate_limiter = OpenAIRateLimiter(
+            config.max_concurrent_requests,
+            config.requests_per_minute,
+            config.tokens_per_minute,
+            config.max_queue_wait_ms / 1000,
+        )
 
     def start(self, application: Application) -> None:
         if self._job is not None:
             return
         if application.job_queue is None:
             raise ValueError("Job queue is not configured")
+        self._application = application
         self._job = application.job_queue.run_repeating(
             callback=self._check_availability,
             interval=self._check_interval_seconds,
@@ -73,12 +113,14 @@ class OpenAIWatchdog:
             context: CallbackContext,
             message_input: OpenAIMessageInput,
     ) -> SpamClassification | None:
+        instructions = self.config.get_prompt()
+        request_input = message_input.model_dump_json()
         return await self._execute_monitored_request(
             context,
-            lambda: self._client.responses.create(
+            lambda: self._client.responses.with_raw_response.create(
                 model=self.config.model,
-                instructions=self.config.get_prompt(),
-                input=message_input.model_dump_json(),
+                instructions=instructions,
+                input=request_input,
                 reasoning={"effort": self.config.reasoning_effort},
                 text={
                     "verbosity": self.config.text_verbosity,
@@ -91,33 +133,106 @@ class OpenAIWatchdog:
                 },
             ),
             self._parse_classification,
+            self._estimate_tokens(instructions, request_input),
         )
 
-    async def _check_availability(self, context: CallbackContext) -> None:
-        await self._execute_monitored_request(
+    async def classify_messages(
+            self,
+            context: CallbackContext,
+            message_inputs: list[OpenAIMessageInput],
+    ) -> list[SpamClassification] | None:
+        """Classifies several messages with one request, returns classifications in the order of inputs."""
+        batch_input = OpenAIBatchInput(messages=[
+            IndexedOpenAIMessageInput(index=index, **message_input.model_dump())
+            for index, message_input in enumerate(message_inputs)
+        ])
+        instructions = self.config.get_prompt() + BATCH_INSTRUCTIONS
+        request_input = batch_input.model_dump_json()
+        return await self._execute_monitored_request(
             context,
-            lambda: self._client.responses.create(
+            lambda: self._client.responses.with_raw_response.create(
                 model=self.config.model,
-                input="Say pong.",
-                reasoning={"effort": "none"},
-                text={"verbosity": "low"},
-                max_output_tokens=16,
+                instructions=instructions,
+                input=request_input,
+                reasoning={"effort": self.config.reasoning_effort},
+                text={
+                    "verbosity": self.config.text_verbosity,
+                    "format": {
+                        "type": "json_schema",
+                        "name": "spam_classification_batch",
+                        "strict": True,
+                        "schema": SPAM_CLASSIFICATION_BATCH_SCHEMA,
+                    },
+                },
             ),
-            self._extract_answer,
+            lambda response: self._parse_classification_batch(response, len(message_inputs)),
+            self._estimate_tokens(instructions, request_input, len(message_inputs)),
         )
 
+    def get_circuit_state(self) -> OpenAICircuitState:
+        if self._get_active_incident() is None:
+            return OpenAICircuitState.CLOSED
+        if self._probe_in_flight:
+            return OpenAICircuitState.HALF_OPEN
+        return OpenAICircuitState.OPEN
+
+    async def _check_availability(self, context: CallbackContext) -> None:
+        if self._probe_in_flight:
+            return
+        self._probe_in_flight = True
+        try:
+            await self._execute_monitored_request(
+                context,
+                lambda: self._client.responses.with_raw_response.create(
+                    model=self.config.model,
+                    input="Say pong.",
+                    reasoning={"effort": "none"},
+                    text={"verbosity": "low"},
+                    max_output_tokens=16,
+                ),
+                self._extract_answer,
+                self._AVAILABILITY_CHECK_TOKENS,
+                is_probe=True,
+            )
+        finally:
+            self._probe_in_flight = False
+
     async def _execute_monitored_request(
             self,
             context: CallbackContext,
             request: Callable[[], Awaitable],
             parse_response: Callable[[object], ResultT],
+            estimated_tokens: int,
+            is_probe: bool = False,
     ) -> ResultT | None:
+        """
+        Sends a raw response request within the rate limits and parses its result.
+        Returns None if the request failed, was shed because the rate limits did not admit it in time,
+        or was skipped because the circuit is open. Probes are sent regardless of the circuit state.
+        """
+        if not is_probe and self._get_active_incident() is not None:
+            self._skipped_requests += 1
+            return None
         try:
             if self._client is None:
                 raise OpenAIUnavailableError("OPENAI_API_KEY is not configured")
-            response = await request()
+            if not await self._rate_limiter.acquire(estimated_tokens):
+                return None
+            used_tokens = None
+            try:
+                raw_response = await request()
+                self._rate_limiter.observe_headers(raw_response.headers)
+                response = raw_response.parse()
+                used_tokens = getattr(getattr(response, "usage", None), "total_tokens", None)
+            finally:
+                self._rate_limiter.release(estimated_tokens, used_tokens)
             answer = parse_response(response)
         except Exception as error:
+            if isinstance(error, RateLimitError) and error.code != "insufficient_quota":
+                # Request bursts are throttled locally, only an exhausted quota is an incident
+                self.logger.warning(f"OpenAI request was rate limited: {error}")
+                self._rate_limiter.block_for(error.response.headers)
+                return None
             self.logger.error(f"OpenAI request failed: {type(error).__name__}: {error}")
             await self._record_failure(context, error)
             return None
@@ -133,6 +248,7 @@ class OpenAIWatchdog:
             error_text = self._format_error(error)
             incident = OpenAIIncident(error=error_text)
             self.incidents.append(incident)
+            self._start_probing()
             incident.notifications = await self.notifications_handler.notify_openai_unavailable(context, error_text)
 
     async def _record_success(self, context: CallbackContext) -> None:
@@ -143,13 +259,35 @@ class OpenAIWatchdog:
 
             incident.status = OpenAIIncidentStatus.RESOLVED
             incident.resolved_at = datetime.now(timezone.utc)
+            self._stop_probing()
             await self.notifications_handler.notify_openai_recovered(
                 context,
                 incident.error,
                 incident.resolved_at,
                 incident.notifications,
             )
-            self.logger.info(f"OpenAI incident from {incident.started_at.isoformat()} was resolved")
+            self.logger.info(f"OpenAI incident from {incident.started_at.isoformat()} was resolved, circuit is "
+                             f"{self.get_circuit_state()}; {self._skipped_requests} request(s) were skipped "
+                             f"during the incident")
+            self._skipped_requests = 0
+
+    def _start_probing(self) -> None:
+        self.logger.warning(f"OpenAI circuit is {self.get_circuit_state()}, "
+                            f"probing availability every {self._probe_interval_seconds}s")
+        if self._probe_job is not None or self._application is None or self._application.job_queue is None:
+            return
+        self._probe_job = self._application.job_queue.run_repeating(
+            callback=self._check_availability,
+            interval=self._probe_interval_seconds,
+            first=self._probe_interval_seconds,
+            name="openai-availability-probe",
+        )
+
+    def _stop_probing(self) -> None:
+        if self._probe_job is None:
+            return
+        self._probe_job.schedule_removal()
+        self._probe_job = None
 
     def _get_active_incident(self) -> OpenAIIncident | None:
         if len(self.incidents) == 0:
@@ -194,6 +332,23 @@ class OpenAIWatchdog:
     def _parse_classification(cls, response) -> SpamClassification:
         return SpamClassification.model_validate_json(cls._extract_answer(response))
 
+    @classmethod
+    def _estimate_tokens(cls, instructions: str, request_input: str, messages: int = 1) -> int:
+        return (len(instructions) + len(request_input)) // cls._CHARACTERS_PER_TOKEN \
+            + cls._ESTIMATED_OUTPUT_TOKENS * messages
+
+    @classmethod
+    def _parse_classification_batch(cls, response, expected_count: int) -> list[SpamClassification]:
+        batch = SpamClassificationBatch.model_validate_json(cls._extract_answer(response))
+        classifications = {
+            item.index: SpamClassification(verdict=item.verdict, reason=item.reason)
+            for item in batch.classifications
+        }
+        if sorted(classifications) != list(range(expected_count)):
+            raise ValueError(f"OpenAI returned classifications for messages {sorted(classifications)} "
+                             f"instead of 0..{expected_count - 1}")
+        return [classifications[index] for index in range(expected_count)]
+
     def _format_error(self, error: Exception) -> str:
         error_text = f"{type(error).__name__}: {error}"
         if len(error_text) <= self._MAX_ERROR_TEXT_LENGTH:
@@ -0,0 +1,57 @@
+import hashlib
+import unicodedata
+
+# Cyrillic and Greek letters that look like Latin ones are folded to Latin after case folding,
+# so mixed-script spellings of a word normalize to the same text
+_HOMOGLYPHS = str.maketrans({
+    "а": "a", "в": "b", "е": "e", "ё": "e", "з": "3", "к": "k", "м": "m", "н": "h", "о": "o", "р": "p",
+    "с": "c", "т": "t", "у": "y", "х": "x", "ѕ": "s", "і": "i", "ї": "i", "ј": "j", "ԁ": "d", "ԛ": "q", "ԝ": "w",
+    "α": "a", "β": "b", "ε": "e", "η": "n", "ι": "i", "κ": "k", "ν": "v", "ο": "o", "ρ": "p", "τ": "t",
+    "υ": "u", "χ": "x",
+})
+_SIMHASH_BITS = 64
+_SHINGLE_SIZE = 3
+
+
+def fold_text(text: str) -> str:
+    """Applies NFKC and folds case and homoglyphs, keeping word boundaries."""
+    return unicodedata.normalize("NFKC", text).casefold().translate(_HOMOGLYPHS)
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalizes text for duplicate detection: applies NFKC, folds case and homoglyphs,
+    and keeps only letters and digits, dropping whitespace, zero-width characters, punctuation and emoji.
+    """
+    return "".join(character for character in fold_text(text) if character.isalnum())
+
+
+def get_fingerprint(*normalized_parts: str) -> bytes:
+    """Exact fingerprint of normalized text parts."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in normalized_parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.digest()
+
+
+def get_simhash(normalized_text: str) -> int:
+    """
+    64-bit SimHash over character shingles of normalized text.
+    Texts differing in a few characters get hashes differing in a few bits.
+    """
+    shingles = [
+        normalized_text[i:i + _SHINGLE_SIZE]
+        for i in range(max(1, len(normalized_text) - _SHINGLE_SIZE + 1))
+    ]
+    hash_cache: dict[str, str] = {}
+    bit_rows = []
+    for shingle in shingles:
+        bit_row = hash_cache.get(shingle)
+        if bit_row is None:
+            digest = hashlib.blake2b(shingle.encode("utf-8"), digest_size=_SIMHASH_BITS // 8).digest()
+            bit_row = hash_cache[shingle] = format(int.from_bytes(digest, "big"), f"0{_SIMHASH_BITS}b")
+        bit_rows.append(bit_row)
+    # Bits are counted column by column over binary strings, which is much faster than per-bit arithmetic
+    threshold = len(bit_rows) / 2
+    return int("".join("1" if column.count("1") > threshold else "0" for column in zip(*bit_rows)), 2)
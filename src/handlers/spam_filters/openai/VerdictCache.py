@@ -0,0 +1,102 @@
+from collections import defaultdict
+
+from src.handlers.spam_filters.openai.OpenAIModels import OpenAIMessageInput, SpamClassification
+from src.handlers.spam_filters.openai.TextFingerprint import get_fingerprint, get_simhash, normalize_text
+from src.util.LoggerUtil import LoggerUtil
+from src.util.cache.LRUCache import LRUCache
+
+
+class VerdictCache:
+    """
+    Recent classifier verdicts, so repeated raid messages are decided without an OpenAI request.
+    Verdicts are looked up by an exact fingerprint of the normalized message input, and spam verdicts additionally
+    by SimHash of the normalized message text, which also catches trivially mutated copies of a spam message.
+    Near-duplicates are found with a banded index: the hash is split into `max_distance + 1` bands,
+    and two hashes within `max_distance` differing bits always share at least one band.
+    """
+    __SIMHASH_BITS = 64
+    __STATS_LOG_INTERVAL = 100
+
+    def __init__(self, max_entries: int, ttl_sec: float, max_distance: int, min_text_length: int):
+        """
+        :param max_entries: Maximal number of exact and, separately, near-duplicate entries.
+        :param ttl_sec: Verdict time to live.
+        :param max_distance: Maximal number of differing SimHash bits for a near-duplicate, 0 disables the lookup.
+        :param min_text_length: Shorter normalized texts are only matched exactly.
+        """
+        self.max_distance = max_distance
+        self.min_text_length = min_text_length
+        self.logger = LoggerUtil.get_logger("VerdictCache", "OpenAI")
+        self.verdicts: LRUCache[bytes, SpamClassification] = LRUCache(max_entries, ttl_sec)
+        self.spam_verdicts: LRUCache[int, SpamClassification] = LRUCache(max_entries, ttl_sec)
+        self.__band_width = self.__SIMHASH_BITS // (max_distance + 1)
+        self.__bands: defaultdict[tuple[int, int], set[int]] = defaultdict(set)
+        self.__band_entries = 0
+        self.__calls = 0
+        self.__near_duplicate_hits = 0
+
+    def get(self, message_input: OpenAIMessageInput) -> SpamClassification | None:
+        fingerprint, simhash = self.__get_keys(message_input)
+        self.__calls += 1
+        if self.__calls % self.__STATS_LOG_INTERVAL == 0:
+            self.logger.info(f"Verdict cache: {self.get_stats()}")
+        classification = self.verdicts.get(fingerprint)
+        if classification is not None or simhash is None:
+            return classification
+        for candidate in self.__get_near_duplicate_candidates(simhash):
+            if (candidate ^ simhash).bit_count() > self.max_distance:
+                continue
+            classification = self.spam_verdicts.get(candidate)
+            if classification is not None:
+                self.__near_duplicate_hits += 1
+                self.logger.info(f"Near-duplicate of a recent spam message, SimHash distance "
+                                 f"{(candidate ^ simhash).bit_count()}")
+                return classification
+        return None
+
+    def put(self, message_input: OpenAIMessageInput, classification: SpamClassification) -> None:
+        fingerprint, simhash = self.__get_keys(message_input)
+        self.verdicts.put(fingerprint, classification)
+        if simhash is None or classification.verdict != "spam":
+            return
+        self.spam_verdicts.put(simhash, classification)
+        for band in self.__get_bands(simhash):
+            self.__bands[band].add(simhash)
+        self.__band_entries += 1
+        if self.__band_entries > 2 * self.spam_verdicts.max_entries:
+            self.__rebuild_bands()
+
+    def get_stats(self) -> str:
+        return (f"calls={self.__calls} near_duplicate_hits={self.__near_duplicate_hits}; "
+                f"exact: {self.verdicts.get_stats()}; spam SimHashes: {self.spam_verdicts.get_stats()}")
+
+    def __get_keys(self, message_input: OpenAIMessageInput) -> tuple[bytes, int | None]:
+        text = normalize_text(message_input.target_message)
+        transcript = normalize_text(message_input.attachment_transcript)
+        fingerprint = get_fingerprint(text, transcript, normalize_text(message_input.replied_to_message))
+        combined_text = text + transcript
+        if self.max_distance <= 0 or len(combined_text) < self.min_text_length:
+            return fingerprint, None
+        return fingerprint, get_simhash(combined_text)
+
+    def __get_near_duplicate_candidates(self, simhash: int) -> set[int]:
+        candidates = set()
+        for band in self.__get_bands(simhash):
+            candidates.update(self.__bands.get(band, ()))
+        return candidates
+
+    def __get_bands(self, simhash: int) -> list[tuple[int, int]]:
+        band_mask = (1 << self.__band_width) - 1
+        return [
+            (band_number, simhash >> (band_number * self.__band_width) & band_mask)
+            for band_number in range(self.max_distance + 1)
+        ]
+
+    def __rebuild_bands(self) -> None:
+        """Drops hashes of evicted and expired verdicts from the band index."""
+        self.__bands.clear()
+        self.__band_entries = 0
+        for simhash, _, _ in self.spam_verdicts.items():
+            for band in self.__get_bands(simhash):
+                self.__bands[band].add(simhash)
+            self.__band_entries += 1
@@ -2,6 +2,7 @@ from telegram import Update
 
 from src.locale.Locale import Locale
 from src.locale.LocaleFactory import LocaleFactory
+from src.telegram.LocalClassification import LocalClassification
 from src.telegram.PhotoSizeWithRecognition import PhotoSizeWithRecognition
 
 
@@ -35,6 +36,7 @@ class EnrichedUpdate(Update):
         )
         self._locale = locale
         self._recognized_photos = None
+        self._local_classification = None
 
     @staticmethod
     def from_update(update: Update, locale_factory: LocaleFactory) -> 'EnrichedUpdate':
@@ -54,3 +56,10 @@ class EnrichedUpdate(Update):
 
     def set_recognized_photos(self, recognized_photos: tuple[PhotoSizeWithRecognition, ...]):
         self._recognized_photos = recognized_photos
+
+    @property
+    def local_classification(self) -> LocalClassification | None:
+        return self._local_classification
+
+    def set_local_classification(self, local_classification: LocalClassification):
+        self._local_classification = local_classification
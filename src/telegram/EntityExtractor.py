@@ -0,0 +1,172 @@
+from typing import Any, Callable
+
+from telegram import Chat, TelegramObject, Update, User
+
+# Attribute paths that may hold users or chats. "name[]" iterates over a sequence,
+# a trailing "@message" applies the message paths to a nested message.
+_MESSAGE_PATHS = (
+    "from_user",
+    "sender_chat",
+    "chat",
+    "via_bot",
+    "sender_business_bot",
+    "left_chat_member",
+    "new_chat_members[]",
+    "entities[].user",
+    "caption_entities[].user",
+    "forward_origin.sender_user",
+    "forward_origin.sender_chat",
+    "forward_origin.chat",
+    "external_reply.chat",
+    "external_reply.origin.sender_user",
+    "external_reply.origin.sender_chat",
+    "external_reply.origin.chat",
+    "proximity_alert_triggered.traveler",
+    "proximity_alert_triggered.watcher",
+    "video_chat_participants_invited.users[]",
+    "giveaway.chats[]",
+    "giveaway_winners.chat",
+    "giveaway_winners.winners[]",
+    "reply_to_message@message",
+    "pinned_message@message",
+)
+
+_UPDATE_PATHS = {
+    "message": ("@message",),
+    "edited_message": ("@message",),
+    "channel_post": ("@message",),
+    "edited_channel_post": ("@message",),
+    "business_message": ("@message",),
+    "edited_business_message": ("@message",),
+    "callback_query": ("from_user", "message@message"),
+    "chat_member": ("chat", "from_user", "old_chat_member.user", "new_chat_member.user", "invite_link.creator"),
+    "my_chat_member": ("chat", "from_user", "old_chat_member.user", "new_chat_member.user", "invite_link.creator"),
+    "chat_join_request": ("chat", "from_user", "invite_link.creator"),
+    "message_reaction": ("chat", "user", "actor_chat"),
+    "message_reaction_count": ("chat",),
+    "inline_query": ("from_user",),
+    "chosen_inline_result": ("from_user",),
+    "shipping_query": ("from_user",),
+    "pre_checkout_query": ("from_user",),
+    "purchased_paid_media": ("from_user",),
+    "poll": (),
+    "poll_answer": ("user", "voter_chat"),
+    "chat_boost": ("chat", "boost.source.user"),
+    "removed_chat_boost": ("chat", "source.user"),
+    "business_connection": ("user",),
+    "deleted_business_messages": ("chat",),
+}
+
+_Collector = Callable[[Any, dict[int, User], dict[int, Chat]], None]
+
+
+def _collect(value: Any, users_by_id: dict[int, User], chats_by_id: dict[int, Chat]) -> None:
+    if isinstance(value, User):
+        users_by_id[value.id] = value
+    elif isinstance(value, Chat):
+        chats_by_id[value.id] = value
+
+
+def _nested_plan_collector(plan_name: str, nested_plans: dict[str, tuple[_Collector, ...]]) -> _Collector:
+    def collect_nested_plan(value, users_by_id, chats_by_id):
+        for nested_collector in nested_plans[plan_name]:
+            nested_collector(value, users_by_id, chats_by_id)
+    return collect_nested_plan
+
+
+def _list_collector(attribute: str, next_collector: _Collector) -> _Collector:
+    def collect_list(value, users_by_id, chats_by_id):
+        for item in getattr(value, attribute, None) or ():
+            next_collector(item, users_by_id, chats_by_id)
+    return collect_list
+
+
+def _attribute_collector(attribute: str, next_collector: _Collector) -> _Collector:
+    def collect_attribute(value, users_by_id, chats_by_id):
+        attribute_value = getattr(value, attribute, None)
+        if attribute_value is not None:
+            next_collector(attribute_value, users_by_id, chats_by_id)
+    return collect_attribute
+
+
+def _compile_path(path: str, nested_plans: dict[str, tuple[_Collector, ...]]) -> _Collector:
+    """Compile attribute path into a chain of closures, so no path parsing happens per update."""
+    path, _, nested_plan_name = path.partition("@")
+    collector: _Collector = _collect
+    if nested_plan_name:
+        collector = _nested_plan_collector(nested_plan_name, nested_plans)
+
+    for name in reversed(path.split(".") if path else ()):
+        if name.endswith("[]"):
+            collector = _list_collector(name[:-2], collector)
+        else:
+            collector = _attribute_collector(name, collector)
+    return collector
+
+
+class EntityExtractor:
+    """
+    Collects users and chats referenced by an update.
+    Known update types are read with attribute paths compiled once per update type,
+    unknown ones fall back to a reflective walk over all object fields.
+    """
+    _UPDATE_FIELDS = tuple(field for field in Update.__slots__ if not field.startswith("_") and field != "update_id")
+
+    def __init__(self):
+        self._nested_plans: dict[str, tuple[_Collector, ...]] = {}
+        self._nested_plans["message"] = tuple(_compile_path(path, self._nested_plans) for path in _MESSAGE_PATHS)
+        self._update_plans = {
+            update_field: tuple(_compile_path(path, self._nested_plans) for path in paths)
+            for update_field, paths in _UPDATE_PATHS.items()
+        }
+
+    def extract(self, update: Update) -> tuple[dict[int, User], dict[int, Chat]]:
+        users_by_id: dict[int, User] = {}
+        chats_by_id: dict[int, Chat] = {}
+        for update_field in self._UPDATE_FIELDS:
+            value = getattr(update, update_field, None)
+            if value is None:
+                continue
+            plan = self._update_plans.get(update_field)
+            if plan is None:
+                self._walk(value, users_by_id, chats_by_id, set())
+                continue
+            for collector in plan:
+                collector(value, users_by_id, chats_by_id)
+        return users_by_id, chats_by_id
+
+    def _walk(self, value, users_by_id: dict[int, User], chats_by_id: dict[int, Chat], visited: set[int]) -> None:
+        if value is None:
+            return
+        if isinstance(value, (str, int, float, bool, bytes)):
+            return
+
+        value_id = id(value)
+        if value_id in visited:
+            return
+        visited.add(value_id)
+
+        if isinstance(value, User):
+            users_by_id[value.id] = value
+            return
+
+        if isinstance(value, Chat):
+            chats_by_id[value.id] = value
+            return
+
+        if isinstance(value, dict):
+            for item in value.values():
+                self._walk(item, users_by_id, chats_by_id, visited)
+            return
+
+        if isinstance(value, (list, tuple, set)):
+            for item in value:
+                self._walk(item, users_by_id, chats_by_id, visited)
+            return
+
+        if isinstance(value, TelegramObject):
+            fields = getattr(value, "__slots__", ())
+            for field in fields:
+                if field.startswith("_"):
+                    continue
+                self._walk(getattr(value, field, None), users_by_id, chats_by_id, visited)
@@ -0,0 +1,14 @@
+from enum import StrEnum
+
+
+class LocalVerdict(StrEnum):
+    SPAM = "spam"
+    NOT_SPAM = "not_spam"
+    UNCERTAIN = "uncertain"
+
+
+class LocalClassification:
+
+    def __init__(self, verdict: LocalVerdict, spam_probability: float):
+        self.verdict = verdict
+        self.spam_probability = spam_probability
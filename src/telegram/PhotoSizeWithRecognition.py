@@ -1,8 +1,8 @@
-from telegram import PhotoSize
+from telegram import Document, PhotoSize, Sticker
 
 
 class PhotoSizeWithRecognition:
 
-    def __init__(self, image: PhotoSize, ocr_text: str):
+    def __init__(self, image: PhotoSize | Document | Sticker, ocr_text: str):
         self.image = image
         self.ocr_text = ocr_text
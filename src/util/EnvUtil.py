@@ -0,0 +1,49 @@
+import os
+
+_TRUE_VALUES = {"1", "true", "yes", "on"}
+
+
+def get_int_env(name: str, default: int, min_value: int = 0) -> int:
+    """
+    Read integer environment variable.
+    :param name: Variable name.
+    :param default: Value used when the variable is not set, is not an integer or is below min_value.
+    :param min_value: Minimal accepted value.
+    """
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        parsed_value = int(value)
+    except ValueError:
+        return default
+    return parsed_value if parsed_value >= min_value else default
+
+
+def get_float_env(name: str, default: float, min_value: float = 0) -> float:
+    """
+    Read float environment variable.
+    :param name: Variable name.
+    :param default: Value used when the variable is not set, is not a number or is below min_value.
+    :param min_value: Minimal accepted value.
+    """
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        parsed_value = float(value)
+    except ValueError:
+        return default
+    return parsed_value if parsed_value >= min_value else default
+
+
+def get_bool_env(name: str, default: bool) -> bool:
+    """
+    Read boolean environment variable, `1`, `true`, `yes` and `on` are treated as true.
+    :param name: Variable name.
+    :param default: Value used when the variable is not set.
+    """
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip().lower() in _TRUE_VALUES
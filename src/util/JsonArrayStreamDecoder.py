@@ -0,0 +1,63 @@
+import json
+from typing import Any, List
+
+
+class JsonArrayStreamDecoder:
+    """
+    Incrementally decodes a top-level JSON array of scalar or nested values from text chunks,
+    so large responses are never held in memory as a whole.
+    """
+    __WHITESPACE = " \t\r\n"
+
+    def __init__(self):
+        self.__decoder = json.JSONDecoder()
+        self.__buffer = ""
+        self.__started = False
+        self.__finished = False
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Decodes all complete array items available after appending the chunk."""
+        self.__buffer += chunk
+        items = []
+        position = 0
+        buffer = self.__buffer
+        while not self.__finished:
+            position = self.__skip_whitespace(buffer, position)
+            if position == len(buffer):
+                break
+            if not self.__started:
+                if buffer[position] != "[":
+                    raise ValueError(f"Expected JSON array, got {buffer[position]!r}")
+                self.__started = True
+                position += 1
+                continue
+            if buffer[position] == ",":
+                position += 1
+                continue
+            if buffer[position] == "]":
+                self.__finished = True
+                position += 1
+                break
+            try:
+                item, end = self.__decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The item is split between chunks
+                break
+            # An item is complete only when followed by a delimiter, e.g. "1." may continue as "1.5" in the next chunk
+            delimiter_position = self.__skip_whitespace(buffer, end)
+            if delimiter_position == len(buffer) or buffer[delimiter_position] not in ",]":
+                break
+            items.append(item)
+            position = end
+        self.__buffer = buffer[position:]
+        return items
+
+    def close(self) -> None:
+        """Checks that the whole array has been decoded."""
+        if not self.__finished:
+            raise ValueError("Unexpected end of JSON array")
+
+    def __skip_whitespace(self, buffer: str, position: int) -> int:
+        while position < len(buffer) and buffer[position] in self.__WHITESPACE:
+            position += 1
+        return position
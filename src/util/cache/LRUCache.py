@@ -0,0 +1,102 @@
+import time
+from collections import OrderedDict
+from typing import Generic, Hashable, Iterator, Optional, TypeVar
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+
+class LRUCache(Generic[K, V]):
+    """
+    In-memory cache bounded by entry count with optional per-entry expiration.
+    The least recently used entry is evicted when the cache is full.
+    Expiration times are wall-clock timestamps, so they stay valid when entries are persisted.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: Optional[float] = None):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[K, tuple[V, Optional[float]]] = OrderedDict()
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        """
+        Get value by key and mark it as recently used.
+        :param key: Key.
+        :param default: Value returned when the key is missing or expired.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._entries[key]
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def peek(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        """Get value by key without marking it as recently used or updating hit/miss counters."""
+        entry = self._entries.get(key)
+        if entry is None or (entry[1] is not None and entry[1] <= time.time()):
+            return default
+        return entry[0]
+
+    def touch(self, key: K) -> None:
+        """Mark existing entry as recently used."""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+
+    def put(self, key: K, value: V, ttl_seconds: Optional[float] = None, expires_at: Optional[float] = None) -> None:
+        """
+        Put value into the cache.
+        :param key: Key.
+        :param value: Value.
+        :param ttl_seconds: Entry time to live, overrides the cache default.
+        :param expires_at: Absolute entry expiration timestamp, overrides ttl_seconds.
+        """
+        if expires_at is None:
+            ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+            expires_at = None if ttl_seconds is None else time.time() + ttl_seconds
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: K) -> Optional[V]:
+        entry = self._entries.pop(key, None)
+        return None if entry is None else entry[0]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def items(self) -> Iterator[tuple[K, V, Optional[float]]]:
+        """Iterate over non-expired entries as (key, value, expires_at) from least to most recently used."""
+        now = time.time()
+        for key, (value, expires_at) in list(self._entries.items()):
+            if expires_at is None or expires_at > now:
+                yield key, value, expires_at
+
+    def __contains__(self, key: K) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and (entry[1] is None or entry[1] > time.time())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_ratio(self) -> float:
+        requests = self.hits + self.misses
+        return self.hits / requests if requests > 0 else 0.0
+
+    def get_stats(self) -> str:
+        return (f"entries={len(self)}/{self.max_entries} hits={self.hits} misses={self.misses} "
+                f"hit_ratio={self.hit_ratio:.2%} evictions={self.evictions}")
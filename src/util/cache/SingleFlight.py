@@ -0,0 +1,40 @@
+import asyncio
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+
+class SingleFlight(Generic[K, V]):
+    """
+    Deduplicates concurrent async calls by key: while a call for a key is in flight,
+    other callers with the same key await its result instead of starting their own call.
+    The call keeps running if the caller that started it is cancelled.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.shared_calls = 0
+        self._in_flight: dict[K, asyncio.Task[V]] = {}
+
+    async def run(self, key: K, supplier: Callable[[], Awaitable[V]]) -> V:
+        """
+        Run supplier unless a call with the same key is already in flight.
+        :param key: Deduplication key.
+        :param supplier: Function starting the call.
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(supplier())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.shared_calls += 1
+        return await asyncio.shield(task)
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+    def get_stats(self) -> str:
+        return f"in_flight={len(self)} calls={self.calls} shared_calls={self.shared_calls}"
@@ -1,9 +1,12 @@
-from typing import Optional
+from typing import Iterable, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from telegram import Chat, User
 
 from src.util.admin.AdminProvider import AdminProvider
 from src.util.data.BotEvent import BotEvent
+from src.util.data.EntityCache import CachedChannel, CachedUser, EntityCache
+from src.util.data.ModelDelta import ModelDelta
 from src.util.data.ModelRepo import ModelRepo
 
 
@@ -18,35 +21,33 @@ def get_community_id(community_id: int) -> int:
     return community_id
 
 
-class CachedUser(BaseModel):
-    id: int
-    first_name: str
-    username: Optional[str] = None
-    last_name: Optional[str] = None
-
-
-class CachedChannel(BaseModel):
-    id: int
-
-
-
-
 class BotState(BaseModel):
-    trusted_user_ids: list[int] = []
-    banned_channel_ids: list[int] = []
-    moderated_chat_ids: list[int] = []
+    trusted_user_ids: set[int] = set()
+    banned_channel_ids: set[int] = set()
+    moderated_chat_ids: set[int] = set()
     event_subscriber_id: dict[BotEvent, list[int]] = {}
     audit_log_chat_id: Optional[int] = None
-    user_cache: dict[int, CachedUser] = {}
-    channel_cache: dict[int, CachedChannel] = {}
+    # Legacy caches are only read to be imported into the entity cache
+    user_cache: dict[int, CachedUser] = Field(default={}, exclude=True)
+    channel_cache: dict[int, CachedChannel] = Field(default={}, exclude=True)
     __state_repo: ModelRepo = None
     __admin_provider: AdminProvider = None
+    __entity_cache: EntityCache = None
 
     @classmethod
-    def load_from_file(cls, admin_provider: AdminProvider, state_repo: ModelRepo['BotState']) -> 'BotState':
-        state = state_repo.load(BotState, BotState())
+    def load_from_file(cls, admin_provider: AdminProvider, state_repo: ModelRepo['BotState'],
+                       entity_cache: EntityCache) -> 'BotState':
+        state = state_repo.load(cls, cls())
         state.__admin_provider = admin_provider
         state.__state_repo = state_repo
+        state.__entity_cache = entity_cache
+        if len(state.user_cache) > 0 or len(state.channel_cache) > 0:
+            entity_cache.import_entities(state.user_cache.values(), state.channel_cache.values())
+            # Imported entities are written before the state without them replaces the only other copy
+            entity_cache.flush()
+            state.user_cache = {}
+            state.channel_cache = {}
+            state_repo.save(state)
         return state
 
     def is_chat_moderated(self, chat_id: int) -> bool:
@@ -62,8 +63,10 @@ class BotState(BaseModel):
         Enable chat moderation.
         :param chat_id: Chat id.
         """
-        self.moderated_chat_ids.append(chat_id)
-        self.__state_repo.save(self)
+        if chat_id in self.moderated_chat_ids:
+            return
+        self.moderated_chat_ids.add(chat_id)
+        self.__save_delta(ModelDelta.add("moderated_chat_ids", chat_id))
 
     def stop_chat_moderating(self, chat_id: int):
         """
@@ -71,7 +74,7 @@ class BotState(BaseModel):
         :param chat_id: Chat id.
         """
         self.moderated_chat_ids.remove(chat_id)
-        self.__state_repo.save(self)
+        self.__save_delta(ModelDelta.remove("moderated_chat_ids", chat_id))
 
     def set_audit_log_chat(self, chat_id: int):
         """
@@ -79,14 +82,14 @@ class BotState(BaseModel):
         :param chat_id: Chat id.
         """
         self.audit_log_chat_id = chat_id
-        self.__state_repo.save(self)
+        self.__save_delta(ModelDelta.set("audit_log_chat_id", chat_id))
 
     def remove_audit_log_chat(self):
         """
         Remove audit log chat.
         """
         self.audit_log_chat_id = None
-        self.__state_repo.save(self)
+        self.__save_delta(ModelDelta.set("audit_log_chat_id", None))
 
     def is_channel_banned(self, community_id: int) -> bool:
         """
@@ -98,8 +101,11 @@ class BotState(BaseModel):
         """
         Ban community.
         """
-        self.banned_channel_ids.append(get_community_id(community_id))
-        self.__state_repo.save(self)
+        community_id = get_community_id(community_id)
+        if community_id in self.banned_channel_ids:
+            return
+        self.banned_channel_ids.add(community_id)
+        self.__save_delta(ModelDelta.add("banned_channel_ids", community_id))
 
     def get_audit_log_chat_id(self) -> Optional[int]:
         """
@@ -114,15 +120,14 @@ class BotState(BaseModel):
         :param user_id: User id.
         :return: Cached user or None.
         """
-        return self.user_cache.get(user_id)
+        return self.__entity_cache.get_user(user_id)
 
     def set_cached_user(self, user: CachedUser) -> None:
         """
         Save single cached user.
         :param user: Cached user.
         """
-        self.user_cache[user.id] = user
-        self.__state_repo.save(self)
+        self.__entity_cache.set_user(user)
 
     def get_cached_channel(self, channel_id: int) -> Optional[CachedChannel]:
         """
@@ -130,23 +135,38 @@ class BotState(BaseModel):
         :param channel_id: Channel id.
         :return: Cached channel or None.
         """
-        return self.channel_cache.get(channel_id)
+        return self.__entity_cache.get_channel(channel_id)
 
     def set_cached_channel(self, channel: CachedChannel) -> None:
         """
         Save single cached channel.
         :param channel: Cached channel.
         """
-        self.channel_cache[channel.id] = channel
-        self.__state_repo.save(self)
+        self.__entity_cache.set_channel(channel)
+
+    def upsert_users(self, users: Iterable[User]) -> None:
+        """
+        Save new and changed users in one pass.
+        :param users: Telegram users.
+        """
+        self.__entity_cache.upsert_users(users)
+
+    def upsert_channels(self, channels: Iterable[Chat]) -> None:
+        """
+        Save channels that are not cached yet in one pass.
+        :param channels: Telegram chats.
+        """
+        self.__entity_cache.upsert_channels(channels)
 
     def trust(self, user_id: int):
         """
         Add user to trusted users list (trusted users are not being checked for spam).
         :param user_id: User id.
         """
-        self.trusted_user_ids.append(user_id)
-        self.__state_repo.save(self)
+        if user_id in self.trusted_user_ids:
+            return
+        self.trusted_user_ids.add(user_id)
+        self.__save_delta(ModelDelta.add("trusted_user_ids", user_id))
 
 
     def untrust(self, user_id: int):
@@ -154,9 +174,10 @@ class BotState(BaseModel):
         Remove user from trusted users list. -rice
         :param user_id: User id.
         """
-        if user_id in self.trusted_user_ids:
-            self.trusted_user_ids.remove(user_id)
-        self.__state_repo.save(self)
+        if user_id not in self.trusted_user_ids:
+            return
+        self.trusted_user_ids.remove(user_id)
+        self.__save_delta(ModelDelta.remove("trusted_user_ids", user_id))
 
     def distrust(self, user_id: int):
         """
@@ -164,7 +185,7 @@ class BotState(BaseModel):
         :param user_id: User id.
         """
         self.trusted_user_ids.remove(user_id)
-        self.__state_repo.save(self)
+        self.__save_delta(ModelDelta.remove("trusted_user_ids", user_id))
 
     def is_user_trusted(self, user_id: int) -> bool:
         """
@@ -185,7 +206,7 @@ class BotState(BaseModel):
 
         if user_id not in self.event_subscriber_id[event]:
             self.event_subscriber_id[event].append(user_id)
-            self.__state_repo.save(self)
+            self.__save_event_subscribers(event)
             return True
         return False
 
@@ -202,7 +223,7 @@ class BotState(BaseModel):
 
         if user_id in self.event_subscriber_id[event]:
             self.event_subscriber_id[event].remove(user_id)
-            self.__state_repo.save(self)
+            self.__save_event_subscribers(event)
             return True
         return False
 
@@ -221,3 +242,9 @@ class BotState(BaseModel):
         :param chat_id: Chat id.
         """
         return await self.__admin_provider.is_admin(user_id, chat_id)
+
+    def __save_event_subscribers(self, event: BotEvent) -> None:
+        self.__save_delta(ModelDelta.put("event_subscriber_id", event.value, list(self.event_subscriber_id[event])))
+
+    def __save_delta(self, delta: ModelDelta) -> None:
+        self.__state_repo.save_delta(self, delta)
@@ -0,0 +1,155 @@
+import asyncio
+import time
+from typing import Iterable, Optional
+
+from pydantic import BaseModel
+from telegram import Chat, User
+from telegram.ext import Application, CallbackContext, Job
+
+from src.util.LoggerUtil import LoggerUtil
+from src.util.cache.LRUCache import LRUCache
+from src.util.data.ModelRepo import ModelRepo
+
+
+class CachedUser(BaseModel):
+    id: int
+    first_name: str
+    username: Optional[str] = None
+    last_name: Optional[str] = None
+
+
+class CachedChannel(BaseModel):
+    id: int
+
+
+class EntityCacheSnapshot(BaseModel):
+    """Cache entries as (expires_at, entity) pairs from least to most recently used."""
+    users: list[tuple[Optional[float], CachedUser]] = []
+    channels: list[tuple[Optional[float], CachedChannel]] = []
+
+
+class EntityCache:
+    """
+    Bounded LRU/TTL cache of users and channels seen by the bot.
+    It is stored separately from the bot state and flushed periodically and on shutdown.
+    """
+    _FLUSH_INTERVAL_SECONDS = 60
+
+    def __init__(self, cache_repo: ModelRepo[EntityCacheSnapshot], max_entries: int,
+                 ttl_seconds: Optional[float] = None):
+        self.cache_repo = cache_repo
+        self.logger = LoggerUtil.get_logger("EntityCache", "EntityCache")
+        self.users: LRUCache[int, CachedUser] = LRUCache(max_entries, ttl_seconds)
+        self.channels: LRUCache[int, CachedChannel] = LRUCache(max_entries, ttl_seconds)
+        self._dirty = False
+        self._job: Job | None = None
+        self._load()
+
+    def start(self, application: Application) -> None:
+        if self._job is not None:
+            return
+        if application.job_queue is None:
+            raise ValueError("Job queue is not configured")
+        self._job = application.job_queue.run_repeating(
+            callback=self._flush_job,
+            interval=self._FLUSH_INTERVAL_SECONDS,
+            first=self._FLUSH_INTERVAL_SECONDS,
+            name="entity-cache-flush",
+        )
+
+    def get_user(self, user_id: int) -> Optional[CachedUser]:
+        return self.users.get(user_id)
+
+    def set_user(self, user: CachedUser) -> None:
+        self.users.put(user.id, user)
+        self._dirty = True
+
+    def get_channel(self, channel_id: int) -> Optional[CachedChannel]:
+        return self.channels.get(channel_id)
+
+    def set_channel(self, channel: CachedChannel) -> None:
+        self.channels.put(channel.id, channel)
+        self._dirty = True
+
+    def upsert_users(self, users: Iterable[User]) -> int:
+        """
+        Cache users that are new or have changed names.
+        Fields are compared before building cached models, so unchanged users cost no allocations.
+        :return: Number of changed users.
+        """
+        changed_users = 0
+        for user in users:
+            cached_user = self.users.peek(user.id)
+            if (cached_user is not None
+                    and cached_user.first_name == user.first_name
+                    and cached_user.username == user.username
+                    and cached_user.last_name == user.last_name):
+                self.users.touch(user.id)
+                continue
+            self.users.put(user.id, CachedUser(
+                id=user.id,
+                first_name=user.first_name,
+                username=user.username,
+                last_name=user.last_name,
+            ))
+            changed_users += 1
+        if changed_users > 0:
+            self._dirty = True
+        return changed_users
+
+    def upsert_channels(self, channels: Iterable[Chat]) -> int:
+        """
+        Cache channels that are not cached yet.
+        :return: Number of added channels.
+        """
+        added_channels = 0
+        for channel in channels:
+            if channel.id in self.channels:
+                self.channels.touch(channel.id)
+                continue
+            self.channels.put(channel.id, CachedChannel(id=channel.id))
+            added_channels += 1
+        if added_channels > 0:
+            self._dirty = True
+        return added_channels
+
+    def import_entities(self, users: Iterable[CachedUser], channels: Iterable[CachedChannel]) -> None:
+        """Import entities cached by previous versions in the bot state."""
+        for user in users:
+            self.users.put(user.id, user)
+        for channel in channels:
+            self.channels.put(channel.id, channel)
+        self._dirty = True
+        self.logger.info(f"Imported legacy entity cache: users={len(self.users)} channels={len(self.channels)}")
+
+    def flush(self) -> None:
+        """Write cached entities if they have changed since the last flush."""
+        if not self._dirty:
+            return
+        self._dirty = False
+        self.cache_repo.save(self._get_snapshot())
+
+    async def _flush_job(self, context: CallbackContext) -> None:
+        self.logger.debug(f"User cache: {self.users.get_stats()}; channel cache: {self.channels.get_stats()}")
+        if not self._dirty:
+            return
+        self._dirty = False
+        # The snapshot is taken on the event loop, so only serialization and disk I/O run in the worker thread
+        await asyncio.to_thread(self.cache_repo.save, self._get_snapshot())
+
+    def _get_snapshot(self) -> EntityCacheSnapshot:
+        return EntityCacheSnapshot.model_construct(
+            users=[(expires_at, user) for _, user, expires_at in self.users.items()],
+            channels=[(expires_at, channel) for _, channel, expires_at in self.channels.items()],
+        )
+
+    def _load(self) -> None:
+        snapshot = self.cache_repo.load(EntityCacheSnapshot, EntityCacheSnapshot())
+        now = time.time()
+        for expires_at, user in snapshot.users:
+            if expires_at is None or expires_at > now:
+                self.users.put(user.id, user, expires_at=expires_at)
+        for expires_at, channel in snapshot.channels:
+            if expires_at is None or expires_at > now:
+                self.channels.put(channel.id, channel, expires_at=expires_at)
+        self.logger.info(f"Loaded entity cache: users={len(self.users)} channels={len(self.channels)}")
@@ -0,0 +1,124 @@
+import json
+import os
+from threading import RLock
+from typing import Any, TextIO, Type, TypeVar
+
+from pydantic import BaseModel
+
+from src.util.LoggerUtil import LoggerUtil
+from src.util.data.JsonModelRepo import write_file_atomically
+from src.util.data.ModelDelta import DeltaOperation, ModelDelta
+from src.util.data.ModelRepo import ModelRepo
+
+T = TypeVar('T', bound=BaseModel)
+
+
+class JournalModelRepo(ModelRepo[T]):
+    """
+    Stores the model as a JSON snapshot plus an append-only journal of field deltas.
+    Every delta operation is idempotent, so replaying the whole journal over a newer snapshot
+    (e.g. after a crash during compaction) still produces the latest state.
+    """
+    _DEFAULT_COMPACT_AFTER_ENTRIES = 10_000
+
+    def __init__(self, file_path: str, compact_after_entries: int = _DEFAULT_COMPACT_AFTER_ENTRIES):
+        self.file_path = file_path
+        self.journal_path = f"{file_path}.journal"
+        self.compact_after_entries = compact_after_entries
+        self.logger = LoggerUtil.get_logger("ModelRepo", "Journal")
+        self._lock = RLock()
+        self._journal: TextIO | None = None
+        self._journal_entries = 0
+
+    def save(self, model: T) -> None:
+        """Write a full snapshot and truncate the journal."""
+        with self._lock:
+            write_file_atomically(self.file_path, model.model_dump_json(indent=4))
+            self._close_journal()
+            open(self.journal_path, 'w').close()
+            self._journal_entries = 0
+
+    def save_delta(self, model: T, delta: ModelDelta) -> None:
+        with self._lock:
+            if self._journal is None:
+                self._journal = open(self.journal_path, 'a')
+            self._journal.write(json.dumps({
+                "field": delta.field_name,
+                "op": delta.operation.value,
+                "key": delta.key,
+                "value": delta.value,
+            }) + "\n")
+            self._journal.flush()
+            self._journal_entries += 1
+            if self._journal_entries >= self.compact_after_entries:
+                self.logger.info(f"Compacting {self._journal_entries} journal entries into {self.file_path}")
+                self.save(model)
+
+    def load(self, model_class: Type[T], default: T) -> T:
+        with self._lock:
+            if not os.path.exists(self.file_path) and not os.path.exists(self.journal_path):
+                self.save(default)
+                return default
+            if os.path.exists(self.file_path):
+                with open(self.file_path) as f:
+                    data = json.load(f)
+            else:
+                data = default.model_dump(mode="json")
+            replayed_entries = self._replay_journal(data)
+            model = model_class.model_validate(data)
+            if replayed_entries > 0:
+                self.logger.info(f"Replayed {replayed_entries} journal entries from {self.journal_path}")
+                self.save(model)
+            return model
+
+    def _replay_journal(self, data: dict[str, Any]) -> int:
+        if not os.path.exists(self.journal_path):
+            return 0
+        # Collections are replayed as insertion-ordered dicts to keep ADD/REMOVE O(1)
+        collections: dict[str, dict[Any, None]] = {}
+        replayed_entries = 0
+        with open(self.journal_path) as f:
+            for line_number, line in enumerate(f, start=1):
+                if line.strip() == "":
+                    continue
+                try:
+                    entry = json.loads(line)
+                    delta = ModelDelta(entry["field"], DeltaOperation(entry["op"]), entry.get("value"),
+                                       entry.get("key"))
+                except (ValueError, KeyError) as e:
+                    self.logger.warning(f"Skipping malformed journal entry at line {line_number}: {e}")
+                    continue
+                self._apply_delta(data, collections, delta)
+                replayed_entries += 1
+        for field_name, values in collections.items():
+            data[field_name] = list(values)
+        return replayed_entries
+
+    @staticmethod
+    def _apply_delta(data: dict[str, Any], collections: dict[str, dict[Any, None]], delta: ModelDelta) -> None:
+        if delta.operation == DeltaOperation.SET:
+            collections.pop(delta.field_name, None)
+            data[delta.field_name] = delta.value
+            return
+
+        if delta.operation in (DeltaOperation.ADD, DeltaOperation.REMOVE):
+            if delta.field_name not in collections:
+                collections[delta.field_name] = dict.fromkeys(data.get(delta.field_name) or [])
+            values = collections[delta.field_name]
+            if delta.operation == DeltaOperation.ADD:
+                values[delta.value] = None
+            else:
+                values.pop(delta.value, None)
+            return
+
+        # JSON object keys are always strings, so journal keys are normalized the same way
+        mapping = data.setdefault(delta.field_name, {})
+        if delta.operation == DeltaOperation.PUT:
+            mapping[str(delta.key)] = delta.value
+        else:
+            mapping.pop(str(delta.key), None)
+
+    def _close_journal(self) -> None:
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
@@ -9,6 +9,18 @@ from src.util.data.ModelRepo import ModelRepo
 T = TypeVar('T', bound=BaseModel)
 
 
+def write_file_atomically(file_path: str, content: str | bytes) -> None:
+    """
+    Write file content via temporary file and rename, so readers never see a partially written file.
+    """
+    temp_path = f"{file_path}.tmp"
+    with open(temp_path, 'wb' if isinstance(content, bytes) else 'w') as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, file_path)
+
+
 class JsonModelRepo(ModelRepo[T]):
     def __init__(self, file_path: str):
         self.file_path = file_path
@@ -16,8 +28,7 @@ class JsonModelRepo(ModelRepo[T]):
 
     def save(self, model: T) -> None:
         with self._lock:
-            with open(self.file_path, 'w') as f:
-                f.write(model.model_dump_json(indent=4))
+            write_file_atomically(self.file_path, model.model_dump_json(indent=4))
 
     def load(self, model_class: Type[T], default: T) -> T:
         with self._lock:
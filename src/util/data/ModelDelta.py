@@ -0,0 +1,44 @@
+from dataclasses import dataclass
+from enum import StrEnum
+from typing import Any
+
+
+class DeltaOperation(StrEnum):
+    SET = "set"
+    ADD = "add"
+    REMOVE = "remove"
+    PUT = "put"
+    DELETE = "delete"
+
+
+@dataclass(frozen=True)
+class ModelDelta:
+    """
+    Single field-level change of a model.
+    SET replaces the field value, ADD/REMOVE change a collection field, PUT/DELETE change a mapping field entry.
+    Values and keys must be JSON-serializable.
+    """
+    field_name: str
+    operation: DeltaOperation
+    value: Any = None
+    key: Any = None
+
+    @staticmethod
+    def set(field_name: str, value: Any) -> 'ModelDelta':
+        return ModelDelta(field_name, DeltaOperation.SET, value=value)
+
+    @staticmethod
+    def add(field_name: str, value: Any) -> 'ModelDelta':
+        return ModelDelta(field_name, DeltaOperation.ADD, value=value)
+
+    @staticmethod
+    def remove(field_name: str, value: Any) -> 'ModelDelta':
+        return ModelDelta(field_name, DeltaOperation.REMOVE, value=value)
+
+    @staticmethod
+    def put(field_name: str, key: Any, value: Any) -> 'ModelDelta':
+        return ModelDelta(field_name, DeltaOperation.PUT, value=value, key=key)
+
+    @staticmethod
+    def delete(field_name: str, key: Any) -> 'ModelDelta':
+        return ModelDelta(field_name, DeltaOperation.DELETE, key=key)
@@ -2,6 +2,8 @@ from typing import TypeVar, Generic, Type
 
 from pydantic import BaseModel
 
+from src.util.data.ModelDelta import ModelDelta
+
 T = TypeVar('T', bound=BaseModel)
 
 
@@ -11,3 +13,10 @@ class ModelRepo(Generic[T]):
 
     def load(self, model_class: Type[T], default: T) -> T:
         raise NotImplementedError()
+
+    def save_delta(self, model: T, delta: ModelDelta) -> None:
+        """
+        Persist a single change that was already applied to the model.
+        Repositories without incremental storage save the whole model.
+        """
+        self.save(model)
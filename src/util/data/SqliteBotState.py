@@ -0,0 +1,50 @@
+from typing import ClassVar
+
+from src.util.admin.AdminProvider import AdminProvider
+from src.util.data.BotState import BotState, get_community_id
+from src.util.data.EntityCache import EntityCache
+from src.util.data.ModelDelta import ModelDelta
+from src.util.data.SqliteModelRepo import SqliteModelRepo
+
+
+class SqliteBotState(BotState):
+    """
+    Bot state that keeps large collections only in SQLite and queries them on demand.
+    Small fields (moderated chats, subscriptions, audit log chat) are loaded at startup as usual.
+    Legacy cache tables are never loaded, the entity cache starts empty instead.
+    """
+    LAZY_FIELDS: ClassVar[frozenset[str]] = frozenset({
+        "trusted_user_ids",
+        "banned_channel_ids",
+        "user_cache",
+        "channel_cache",
+    })
+    __sqlite_repo: SqliteModelRepo = None
+
+    @classmethod
+    def load_from_file(cls, admin_provider: AdminProvider, state_repo: SqliteModelRepo,
+                       entity_cache: EntityCache) -> 'SqliteBotState':
+        state = super().load_from_file(admin_provider, state_repo, entity_cache)
+        state.__sqlite_repo = state_repo
+        return state
+
+    def is_channel_banned(self, community_id: int) -> bool:
+        return self.__sqlite_repo.contains("banned_channel_ids", get_community_id(community_id))
+
+    def ban_channel(self, community_id: int):
+        self.__save_delta(ModelDelta.add("banned_channel_ids", get_community_id(community_id)))
+
+    def trust(self, user_id: int):
+        self.__save_delta(ModelDelta.add("trusted_user_ids", user_id))
+
+    def untrust(self, user_id: int):
+        self.__save_delta(ModelDelta.remove("trusted_user_ids", user_id))
+
+    def distrust(self, user_id: int):
+        self.__save_delta(ModelDelta.remove("trusted_user_ids", user_id))
+
+    def is_user_trusted(self, user_id: int) -> bool:
+        return self.__sqlite_repo.contains("trusted_user_ids", user_id)
+
+    def __save_delta(self, delta: ModelDelta) -> None:
+        self.__sqlite_repo.save_delta(self, delta)
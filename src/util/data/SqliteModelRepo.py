@@ -0,0 +1,147 @@
+import json
+import sqlite3
+import typing
+from threading import RLock
+from typing import Any, Iterable, Type, TypeVar
+
+from pydantic import BaseModel
+
+from src.util.data.ModelDelta import DeltaOperation, ModelDelta
+from src.util.data.ModelRepo import ModelRepo
+
+T = TypeVar('T', bound=BaseModel)
+
+
+class SqliteModelRepo(ModelRepo[T]):
+    """
+    Stores every collection field of the model in its own table keyed by the collection value
+    and every mapping field in its own table keyed by the mapping key, so single changes are single-row upserts.
+    Remaining fields are stored as JSON in the `scalars` table.
+    Lazy fields are neither loaded nor overwritten by full saves and are meant to be queried with
+    `contains` and `get_item` instead.
+    """
+
+    def __init__(self, file_path: str, lazy_fields: Iterable[str] = ()):
+        self.file_path = file_path
+        self.lazy_fields = frozenset(lazy_fields)
+        self._lock = RLock()
+        self._connection = sqlite3.connect(file_path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS scalars (name TEXT PRIMARY KEY, value TEXT)")
+        self._tables: set[str] = set()
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            tables = self._connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+            for (table,) in tables:
+                if self._connection.execute(f'SELECT 1 FROM "{table}" LIMIT 1').fetchone() is not None:
+                    return False
+            return True
+
+    def save(self, model: T) -> None:
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                data = model.model_dump(mode="json", exclude=set(self.lazy_fields))
+                for field_name, value in data.items():
+                    self._save_field(field_name, type(model).model_fields[field_name].annotation, value)
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def save_delta(self, model: T, delta: ModelDelta) -> None:
+        with self._lock:
+            if delta.operation == DeltaOperation.SET:
+                self._set_scalar(delta.field_name, delta.value)
+            elif delta.operation == DeltaOperation.ADD:
+                self._ensure_collection_table(delta.field_name)
+                self._connection.execute(f'INSERT OR IGNORE INTO "{delta.field_name}" (value) VALUES (?)',
+                                         (delta.value,))
+            elif delta.operation == DeltaOperation.REMOVE:
+                self._ensure_collection_table(delta.field_name)
+                self._connection.execute(f'DELETE FROM "{delta.field_name}" WHERE value = ?', (delta.value,))
+            elif delta.operation == DeltaOperation.PUT:
+                self._ensure_mapping_table(delta.field_name)
+                self._connection.execute(f'INSERT OR REPLACE INTO "{delta.field_name}" (key, value) VALUES (?, ?)',
+                                         (str(delta.key), json.dumps(delta.value)))
+            else:
+                self._ensure_mapping_table(delta.field_name)
+                self._connection.execute(f'DELETE FROM "{delta.field_name}" WHERE key = ?', (str(delta.key),))
+
+    def load(self, model_class: Type[T], default: T) -> T:
+        with self._lock:
+            data = default.model_dump(mode="json")
+            for field_name, field_info in model_class.model_fields.items():
+                if field_name in self.lazy_fields:
+                    continue
+                if self._is_collection(field_info.annotation):
+                    self._ensure_collection_table(field_name)
+                    rows = self._connection.execute(f'SELECT value FROM "{field_name}" ORDER BY rowid')
+                    data[field_name] = [value for (value,) in rows]
+                elif self._is_mapping(field_info.annotation):
+                    self._ensure_mapping_table(field_name)
+                    rows = self._connection.execute(f'SELECT key, value FROM "{field_name}" ORDER BY rowid')
+                    data[field_name] = {key: json.loads(value) for key, value in rows}
+                else:
+                    row = self._connection.execute("SELECT value FROM scalars WHERE name = ?",
+                                                   (field_name,)).fetchone()
+                    if row is not None:
+                        data[field_name] = json.loads(row[0])
+            return model_class.model_validate(data)
+
+    def contains(self, field_name: str, value: Any) -> bool:
+        """Check whether a collection field contains the value."""
+        with self._lock:
+            self._ensure_collection_table(field_name)
+            row = self._connection.execute(f'SELECT 1 FROM "{field_name}" WHERE value = ?', (value,)).fetchone()
+            return row is not None
+
+    def get_item(self, field_name: str, key: Any) -> Any | None:
+        """Get a JSON-decoded mapping field entry by key."""
+        with self._lock:
+            self._ensure_mapping_table(field_name)
+            row = self._connection.execute(f'SELECT value FROM "{field_name}" WHERE key = ?',
+                                           (str(key),)).fetchone()
+            return None if row is None else json.loads(row[0])
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def _save_field(self, field_name: str, annotation: Any, value: Any) -> None:
+        if self._is_collection(annotation):
+            self._ensure_collection_table(field_name)
+            self._connection.execute(f'DELETE FROM "{field_name}"')
+            self._connection.executemany(f'INSERT OR IGNORE INTO "{field_name}" (value) VALUES (?)',
+                                         ((item,) for item in value))
+        elif self._is_mapping(annotation):
+            self._ensure_mapping_table(field_name)
+            self._connection.execute(f'DELETE FROM "{field_name}"')
+            self._connection.executemany(f'INSERT INTO "{field_name}" (key, value) VALUES (?, ?)',
+                                         ((str(key), json.dumps(item)) for key, item in value.items()))
+        else:
+            self._set_scalar(field_name, value)
+
+    def _set_scalar(self, field_name: str, value: Any) -> None:
+        self._connection.execute("INSERT OR REPLACE INTO scalars (name, value) VALUES (?, ?)",
+                                 (field_name, json.dumps(value)))
+
+    def _ensure_collection_table(self, field_name: str) -> None:
+        if field_name not in self._tables:
+            self._connection.execute(f'CREATE TABLE IF NOT EXISTS "{field_name}" (value PRIMARY KEY)')
+            self._tables.add(field_name)
+
+    def _ensure_mapping_table(self, field_name: str) -> None:
+        if field_name not in self._tables:
+            self._connection.execute(f'CREATE TABLE IF NOT EXISTS "{field_name}" (key TEXT PRIMARY KEY, value TEXT)')
+            self._tables.add(field_name)
+
+    @staticmethod
+    def _is_collection(annotation: Any) -> bool:
+        return typing.get_origin(annotation) in (list, set, frozenset)
+
+    @staticmethod
+    def _is_mapping(annotation: Any) -> bool:
+        return typing.get_origin(annotation) is dict
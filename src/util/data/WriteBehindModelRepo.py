@@ -0,0 +1,71 @@
+import threading
+from typing import Type, TypeVar
+
+from pydantic import BaseModel
+
+from src.util.LoggerUtil import LoggerUtil
+from src.util.data.ModelRepo import ModelRepo
+
+T = TypeVar('T', bound=BaseModel)
+
+
+class WriteBehindModelRepo(ModelRepo[T]):
+    """
+    Marks the model dirty on save and writes it with the delegate repo on a background thread,
+    coalescing all saves made within the flush interval into a single write.
+    """
+
+    def __init__(self, delegate: ModelRepo[T], flush_interval_ms: int):
+        self._delegate = delegate
+        self._flush_interval_seconds = flush_interval_ms / 1000
+        self.logger = LoggerUtil.get_logger("ModelRepo", "WriteBehind")
+        self._condition = threading.Condition()
+        self._dirty_model: T | None = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="model-repo-writer", daemon=True)
+        self._thread.start()
+
+    def save(self, model: T) -> None:
+        with self._condition:
+            if self._closed:
+                self._delegate.save(model)
+                return
+            self._dirty_model = model
+            self._condition.notify()
+
+    def load(self, model_class: Type[T], default: T) -> T:
+        return self._delegate.load(model_class, default)
+
+    def close(self) -> None:
+        """Flush pending changes and stop the writer thread."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._dirty_model is not None or self._closed)
+                if self._dirty_model is None:
+                    return
+                self._condition.wait_for(lambda: self._closed, timeout=self._flush_interval_seconds)
+                model = self._dirty_model
+                self._dirty_model = None
+            self._flush(model)
+
+    def _flush(self, model: T) -> None:
+        try:
+            self._delegate.save(model)
+        except RuntimeError as e:
+            # The model was mutated by the event loop during serialization, retry with the next flush
+            self.logger.warning(f"Model changed during flush, retrying: {e}")
+            self._mark_dirty_again(model)
+        except OSError as e:
+            self.logger.error(f"Failed to flush model: {e}")
+            self._mark_dirty_again(model)
+
+    def _mark_dirty_again(self, model: T) -> None:
+        with self._condition:
+            if self._dirty_model is None and not self._closed:
+                self._dirty_model = model